@@ -1,5 +1,36 @@
+import random
+import time
 from ai.base_ai import BaseAI
 from ai.MCTS_node import MCTSNode
+from ai.proof_number import WIN
+from engine.tablebase import DRAW
+from ai import worker_pool
+from engine.settings import engine_settings
+
+# A playout without a depth limit is still cut off here and scored by the heuristic.
+MAX_PLAYOUT_PLIES = 200
+
+# Once the best root move wins this share of at least SATURATION_VISITS
+# playouts, the search looks like it is decided and the solver is asked to prove it.
+SATURATION = 0.95
+SATURATION_VISITS = 256
+
+
+def search_root(ai_class, settings, board_dict, color, slot, seed):
+    """
+    Run one tree of a root-parallel search in a pool process.
+
+    Returns the root's children as (move, visits, wins) tuples, the
+    number of iterations run and the size of the tree. The slot's AI is
+    kept, so its tree can be reused on the next move.
+    """
+    random.seed(seed)
+    ai = worker_pool.worker_ai(ai_class, settings, color, slot)
+    ai.cancel_token = worker_pool.cancel_event
+    ai.get_move(board_dict)
+    children = [(child.move, child.visits, child.wins) for child in ai.root.children] if ai.root else []
+    return children, ai.nodes_explored, ai.tree_size
+
 
 class MonteCarloAI(BaseAI):
     def __init__(self, game, color):
@@ -8,70 +39,344 @@ class MonteCarloAI(BaseAI):
         self.heuristic = None  # To be set by subclasses
         self.moves = game.movement
         self.nodes_explored = 0  # Initialize counter
-        
+        self.time_budget = game.settings.ai_time_budget
+        self.iterations = game.settings.mcts_iterations
+        self.playout_depth = game.settings.mcts_playout_depth
+        self.max_nodes = game.settings.mcts_max_nodes
+        self.tree_size = 0  # Nodes in the current search tree
+        self.root = None  # The tree of the last search and the position at its root,
+        self.root_position = None  # kept so the next search can start from a subtree
+        self.reused_visits = 0  # Visits carried over from the previous search
+        self.workers = game.settings.ai_workers
+        if self.time_budget is None and self.iterations is None:
+            raise ValueError("MCTS needs a time budget or an iteration count")
+
     def get_move(self, board_state):
-        self.nodes_explored = 0
+        """
+        Run MCTS iterations from board_state and return the most visited move.
+
+        Iterations run until the time budget is spent or the iteration count
+        is reached, whichever comes first, or until the search is cancelled
+        or past its hard deadline. nodes_explored counts them. When
+        board_state follows from the last search's root by two moves, the
+        search goes on in that part of the old tree.
+        """
+        self.start_move()
         if not board_state:
             return None
-            
-        root = MCTSNode(board_state.copy())
-        root.untried_moves = list(self._get_valid_moves(board_state))
+        move = self.pondered_move(board_state) or self.book_move(board_state) or self.solved_move(board_state)
+        if move is not None:
+            return move
+        if self.workers > 1:
+            return self._parallel_get_move(board_state)
+
+        # A single position is searched in place: each iteration plays its
+        # moves down the tree with make_move and takes them all back after.
+        position = self.to_position(board_state)
+        root = self._reuse_tree(position)
+        if root is None:
+            root = MCTSNode()
+            self.tree_size = 1
+        if root.untried_moves is None:
+            root.untried_moves = list(self._get_valid_moves(position, self.color))
+        self.reused_visits = root.visits
+        self.root, self.root_position = root, position
 
-        num_rollouts = len(root.untried_moves)
-        
         if not root.untried_moves and not root.children:
             return None
-        
-        for _ in range(num_rollouts):
+
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        # Positions small enough were handed to the solver before the search
+        settings = self.game.settings
+        unsolved = settings.solver_nodes > 0 and len(position) > settings.solver_max_pieces
+        node_cap = self.max_nodes
+        while self.iterations is None or self.nodes_explored < self.iterations:
+            # Reading the clock costs about as much as a playout move, so look every 16 iterations
+            if self.nodes_explored & 15 == 0 and (
+                    self.should_stop() or deadline is not None and time.perf_counter() >= deadline):
+                break
+            if unsolved and self.nodes_explored & 255 == 0 and self._saturated(root):
+                unsolved = False  # One try per move
+                result, line = self.solve(position)
+                if result == WIN and line:
+                    self.proven_line = line
+                    self.move_source = 'solver'
+                    return line[0]
             self.nodes_explored += 1
-            node = self._tree_policy(root)
-            if node is None:
-                continue
-                
-            result = self._simulate(node.state.copy())
-            self._backpropagate(node, result)
+            node = self._tree_policy(root, position)
+            if node is not None:
+                depth = len(position.history)
+                result = self._simulate(position)
+                self._backpropagate(node, result, depth)
+            self._rewind(position)
+            if node_cap is not None and self.tree_size >= node_cap:
+                self._recycle(root, self.max_nodes // 2)
+                if self.tree_size > self.max_nodes // 2:
+                    # The root's children can't be collapsed, so a cap below them
+                    # can't be met: allow twice what is left rather than walk the
+                    # tree again every iteration
+                    node_cap = max(self.max_nodes, 2 * self.tree_size)
         #for child in root.children:
         #    print(f"Move: {child.move}, Visits: {child.visits}, Wins: {child.wins}, Win rate: {child.wins / (child.visits + 1e-6)}")
 
         return self._best_move(root)
 
-    def _tree_policy(self, node):
-        while node is not None and not self._is_terminal(node):
+    def search_stats(self):
+        stats = super().search_stats()
+        stats['mcts_iterations'] = self.nodes_explored
+        stats['tree_size'] = self.tree_size
+        stats['reused_visits'] = self.reused_visits
+        return stats
+
+    def _played_child(self, position):
+        """Return the last tree's root child whose move leads to position, or None."""
+        if self.root is None:
+            return None
+        for child in self.root.children:
+            self.root_position.make_move(*child.move)
+            played = self.root_position == position
+            self.root_position.unmake_move()
+            if played:
+                return child
+        return None
+
+    def predict_reply(self, position):
+        """
+        Return the most visited reply to the AI's last move in the last tree.
+
+        Without that tree, as after a root-parallel search, whose trees stay
+        in the workers, the guess is a reply that connects the opponent's
+        pieces or else the one the heuristic scores best for the opponent.
+        """
+        child = self._played_child(position)
+        if child is not None and child.children:
+            return max(child.children, key=lambda reply: reply.visits).move
+        opponent = self._opponent(self.color)
+        best, best_score = None, None
+        for move in self._get_valid_moves(position, opponent):
+            position.make_move(*move)
+            if self.win_checker.check_win(opponent, position):
+                score = float('inf')
+            else:
+                score = self.heuristic.evaluate(position, opponent)
+            position.unmake_move()
+            if best_score is None or score > best_score:
+                best, best_score = move, score
+        return best
+
+    def ponder(self, board_state):
+        """
+        Ponder as BaseAI.ponder does, then put the last tree back with the
+        pondered subtree in it.
+
+        The ponder's search takes the guessed reply's node as its root,
+        which would drop the rest of the tree, and with it the subtree of
+        the reply actually played when the guess is wrong. Hung back under
+        the AI's move, the pondered subtree is found by the next search
+        like any other reply.
+        """
+        old_root, old_position = self.root, self.root_position
+        child = self._played_child(self.to_position(board_state))
+        reply = super().ponder(board_state)
+        pondered = self.root
+        if child is None or reply is None or pondered is None or pondered is old_root:
+            return reply
+        child.children = [node for node in child.children if node is not pondered and node.move != reply]
+        child.children.append(pondered)
+        pondered.parent, pondered.move = child, reply
+        if child.untried_moves and reply in child.untried_moves:
+            child.untried_moves.remove(reply)
+        self.root, self.root_position = old_root, old_position
+        return reply
+
+    def _parallel_get_move(self, board_state):
+        """
+        Root-parallel search: every worker process grows its own tree from
+        board_state with its own random seed, and the visits and wins of the
+        root's children are added up before the move is chosen. The time
+        budget and iteration count hold for each worker. The workers share
+        nothing while they search, see SharedTranspositionTable.
+        """
+        settings = engine_settings(self.game.settings)
+        settings.ai_workers = 1
+        settings.opening_book = None  # The book and the solver were tried before the search
+        settings.solver_nodes = 0
+        settings.ai_hard_limit = None  # The workers are stopped from here, see worker_pool.gather
+        board_dict = dict(board_state)
+        seed = random.getrandbits(32)
+        pool = worker_pool.get_pool(self.workers)
+        futures = [
+            pool.submit(search_root, type(self), settings, board_dict, self.color, slot, seed + slot)
+            for slot in range(self.workers)
+        ]
+
+        root = MCTSNode()
+        merged = {}
+        self.tree_size = 0
+        self.worker_nodes = []
+        for children, iterations, tree_size in worker_pool.gather(futures, self.should_stop):
+            self.nodes_explored += iterations
+            self.worker_nodes.append(iterations)
+            self.tree_size += tree_size
+            for move, visits, wins in children:
+                child = merged.get(move)
+                if child is None:
+                    child = merged[move] = MCTSNode(root, move)
+                    root.children.append(child)
+                child.visits += visits
+                child.wins += wins
+        return self._best_move(root)
+
+    def _tree_policy(self, node, position):
+        while node is not None and not self._is_terminal(position):
             if not node.is_fully_expanded():
-                return self._expand(node)
+                return self._expand(node, position)
             else:
                 node = node.best_child()
+                if node is not None:
+                    self._apply_move(position, node.move)
         return node
 
-    def _expand(self, node):
+    def _expand(self, node, position):
+        if node.untried_moves is None:
+            # Most leaves are never expanded, so their moves are only listed now
+            node.untried_moves = list(self._get_valid_moves(position, self._side_to_move(position)))
         if not node.untried_moves:
             return node
         move = node.untried_moves.pop()
-        new_state = node.state.copy()
-        self._apply_move(new_state, move)
-        child = MCTSNode(new_state, node, move)
-        child.untried_moves = list(self._get_valid_moves(new_state))
+        self._apply_move(position, move)
+        child = MCTSNode(node, move)
         node.children.append(child)
+        self.tree_size += 1
         #print(f"Expanded move: {move}")
         return child
 
-    def _simulate(self, state):
-        if not state:
-            return 0.0
-            
-        if self.win_checker.check_win(self.color, state):
-            return 1.0
-        if self.win_checker.check_win(self._opponent(self.color), state):
-            return 0.0
-        return self.heuristic.evaluate(state, self.color)
+    def _simulate(self, position):
+        """
+        Play random moves from the position and return its value for self.color, from 0 to 1.
+
+        A playout ends when a side is connected, scored 1 or 0, when it
+        reaches a position the tablebase covers, scored by its result, or
+        after playout_depth moves, when the heuristic scores it. The moves stay on
+        the position until _rewind takes them back.
+        """
+        limit = MAX_PLAYOUT_PLIES if self.playout_depth is None else self.playout_depth
+        opponent = self._opponent(self.color)
+        side = self._side_to_move(position)
+        for ply in range(limit + 1):
+            if self.win_checker.check_win(self.color, position):
+                return 1.0
+            if self.win_checker.check_win(opponent, position):
+                return 0.0
+            if self.tablebase is not None and self.tablebase.covers(position):
+                # The endgame's exact result, no need to play it out
+                result, _ = self.tablebase.probe(position, side)
+                if result == DRAW:
+                    return 0.5
+                return 1.0 if (result == WIN) == (side == self.color) else 0.0
+            if ply == limit:
+                break
+            moves = self._get_valid_moves(position, side)
+            if not moves:
+                break
+            position.make_move(*random.choice(moves))
+            side = self._opponent(side)
+        return self.heuristic.evaluate(position, self.color)
+
+    def _saturated(self, root):
+        """Return True when the most visited root move almost always wins its playouts."""
+        if not root.children:
+            return False
+        best = max(root.children, key=lambda child: child.visits)
+        return best.visits >= SATURATION_VISITS and best.wins >= SATURATION * best.visits
 
-    def _backpropagate(self, node, result):
+    def _backpropagate(self, node, result, depth):
+        """
+        Add a playout result, self.color's value of it, to node and its ancestors.
+
+        Each node counts wins for the side that played the move into it, so
+        best_child picks the move that is best for the side choosing. The
+        AI plays the moves into the nodes at odd depths.
+        """
+        if depth % 2 == 0:
+            result = 1 - result
         while node is not None:
             node.visits += 1
             node.wins += result
             result = 1 - result  # Alternate perspective
             node = node.parent
 
+    def _reuse_tree(self, position):
+        """
+        Return the node of the last search's tree that stands for position, as a new root.
+
+        The node is looked for at the old root itself and among its
+        grandchildren, the positions after the AI's move and the reply, by
+        replaying their moves on the old root position. Returns None when
+        there is no tree or no node matches.
+        """
+        old_root, old_position = self.root, self.root_position
+        self.root = self.root_position = None
+        if old_root is None:
+            return None
+        node = old_root if old_position == position else None
+        for child in old_root.children:
+            if node is not None:
+                break
+            old_position.make_move(*child.move)
+            for grandchild in child.children:
+                old_position.make_move(*grandchild.move)
+                if old_position == position:
+                    node = grandchild
+                old_position.unmake_move()
+                if node is not None:
+                    break
+            old_position.unmake_move()
+        if node is None:
+            return None
+
+        # Detach the subtree, the rest of the old tree is freed with it
+        node.parent = None
+        node.move = None
+        nodes = [node]
+        for subtree_node in nodes:
+            nodes.extend(subtree_node.children)
+        self.tree_size = len(nodes)
+        return node
+
+    def _recycle(self, root, target):
+        """
+        Shrink the tree to at most target nodes by collapsing the least visited subtrees.
+
+        A collapsed node keeps its own visits and wins but loses its children
+        and turns back into a leaf, to be expanded again if the search returns
+        to it. The root's children are never removed, only collapsed.
+        """
+        nodes = [root]
+        depths = {id(root): 0}
+        for node in nodes:
+            for child in node.children:
+                depths[id(child)] = depths[id(node)] + 1
+            nodes.extend(node.children)
+        sizes = {}
+        for node in reversed(nodes):
+            sizes[id(node)] = 1 + sum(sizes[id(child)] for child in node.children)
+
+        # Deeper nodes first among equal visits, so a subtree is collapsed before its ancestors
+        candidates = [node for node in nodes if node.children and node is not root]
+        candidates.sort(key=lambda node: (node.visits, -depths[id(node)]))
+        for node in candidates:
+            if self.tree_size <= target:
+                break
+            freed = sizes[id(node)] - 1
+            node.children = []
+            node.untried_moves = None
+            self.tree_size -= freed
+            ancestor = node.parent
+            while ancestor is not None:
+                sizes[id(ancestor)] -= freed
+                ancestor = ancestor.parent
+
     def _best_move(self, root):
         if not root or not root.children:
             return None
@@ -85,20 +390,19 @@ class MonteCarloAI(BaseAI):
         best_child = max(root.children, key=score)
         return best_child.move if best_child else None
 
-    def _is_terminal(self, node):
-        if node is None or not hasattr(node, 'state'):
-            return True
-        return (self.win_checker.check_win(self.color, node.state) or
-                self.win_checker.check_win(self._opponent(self.color), node.state))
+    def _is_terminal(self, position):
+        return (self.win_checker.check_win(self.color, position) or
+                self.win_checker.check_win(self._opponent(self.color), position))
 
-    def _get_valid_moves(self, board):
+    def _get_valid_moves(self, board, player):
         if not board:
             return []
-            
-        for pos in board:
-            if board[pos] == self.color:
-                for move in self.moves.get_valid_moves(pos[0], pos[1]):
-                    yield (pos, move)
+
+        return self.moves.generate_moves(board, player)
+
+    def _side_to_move(self, position):
+        """Return whose turn it is on the search position, the AI moves at the root."""
+        return self.color if len(position.history) % 2 == 0 else self._opponent(self.color)
 
     def _apply_move(self, board, move):
         if not board or not move:
@@ -106,8 +410,12 @@ class MonteCarloAI(BaseAI):
             
         from_pos, to_pos = move
         if from_pos in board:
-            board[to_pos] = board[from_pos]
-            del board[from_pos]
+            board.make_move(from_pos, to_pos)
+
+    def _rewind(self, position):
+        """Take back every move played on the search position."""
+        while position.history:
+            position.unmake_move()
 
     def _opponent(self, color):
         return 'W' if color == 'B' else 'B'
\ No newline at end of file
@@ -1,14 +1,17 @@
 import math
 
 class MCTSNode:
-    def __init__(self, state, parent=None, move=None):
-        self.state = state.copy()  # Ensure we always have a state
+    __slots__ = ('parent', 'move', 'children', 'visits', 'wins', 'untried_moves')
+
+    def __init__(self, parent=None, move=None):
+        # Nodes only keep the move that leads to them, the searched position
+        # is rebuilt by playing the moves from the root.
         self.parent = parent
         self.move = move
         self.children = []
         self.visits = 0
         self.wins = 0.0
-        self.untried_moves = []
+        self.untried_moves = None  # Generated when the node is first expanded
     
     def uct_score(self, total_simulations, exploration=1.4):
         if self.visits == 0:
@@ -22,4 +25,4 @@ class MCTSNode:
         return max(self.children, key=lambda c: c.uct_score(total_visits, exploration))
 
     def is_fully_expanded(self):
-        return len(self.untried_moves) == 0
\ No newline at end of file
+        return self.untried_moves is not None and len(self.untried_moves) == 0
\ No newline at end of file
@@ -33,6 +33,10 @@ class MinimaxBetter(AiModelA_AlphaBeta):
 
 class Random(AiModelA_AlphaBeta):
     """Minimax with random evaluation (for testing)."""
+    def __init__(self, game, color):
+        super().__init__(game, color)
+        self.use_book = False  # The book's moves would make it play well
+
     def get_move(self, board_state):
         def evaluate(board, player):
             return MinimaxAI.random_evaluate(self, board, player)
@@ -1,7 +1,150 @@
+import time
+from ai.proof_number import WIN, ProofNumberSearch
+from engine.book import book_path, open_book
+from engine.tablebase import open_tablebase, tablebase_path
+from game.position import Position
+
 class BaseAI():
     """Interface all AIs must follow."""
     def __init__(self, game, color):
         self.game = game
         self.color = color
         self.search_depth = 3
-        self.nodes_explored = 0
\ No newline at end of file
+        self.completed_depth = None  # Depth of the last finished search, if it varies
+        self.nodes_explored = 0
+        self.worker_nodes = None  # Nodes of each worker process when the search runs in parallel
+        self.move_source = None  # Where the last move came from: 'book', 'solver' or 'search'
+        self.solver = None  # The proof-number solver, made on first use
+        self.proven_line = None  # The winning line of the last position the solver proved
+        self.tablebase = self.open_tablebase()  # Exact results of the endgames it covers
+        self.use_book = True  # False for AIs whose strength the book would change
+        # Anything with is_set(), e.g. a threading or multiprocessing Event:
+        # once it is set the running search stops and returns what it has.
+        self.cancel_token = None
+        self.hard_deadline = None  # time.perf_counter() time the move's search stops at, see start_move
+        # The last ponder: the position it searched, the move it found and
+        # whether the search finished, see ponder
+        self.ponder_board = None
+        self.ponder_move = None
+        self.ponder_finished = False
+
+    def start_move(self):
+        """Reset the statistics of the last move; get_move calls this first."""
+        self.nodes_explored = 0
+        self.worker_nodes = None
+        self.completed_depth = None
+        self.move_source = 'search'
+        limit = self.game.settings.ai_hard_limit
+        self.hard_deadline = None if limit is None else time.perf_counter() + limit
+        # A rebuilt tablebase replaces the file, and the mapping of the old one is closed
+        self.tablebase = self.open_tablebase()
+
+    def open_tablebase(self):
+        """Return the tablebase the settings point to, or None."""
+        path = tablebase_path(self.game.settings)
+        return open_tablebase(path) if path else None
+
+    def should_stop(self):
+        """Return True once the search is cancelled or past its hard deadline; searches check it every few nodes."""
+        if self.cancel_token is not None and self.cancel_token.is_set():
+            return True
+        return self.hard_deadline is not None and time.perf_counter() >= self.hard_deadline
+
+    def search_stats(self):
+        """Return the statistics of the last move, for telemetry."""
+        return {
+            'nodes': self.nodes_explored,
+            'depth': self.completed_depth,
+            'source': self.move_source,
+            'worker_nodes': self.worker_nodes,
+        }
+
+    def predict_reply(self, position):
+        """Return the opponent's likely move on position, the opponent to move; None when it has none."""
+        moves = position.generate_moves('W' if self.color == 'B' else 'B')
+        return moves[0] if moves else None
+
+    def ponder(self, board_state):
+        """
+        Search ahead on the opponent's time; board_state has the opponent to move.
+
+        The AI guesses the reply with predict_reply and searches the
+        position after it as it would on its own turn, until the search is
+        done or should_stop() ends it early. What it learns stays in its
+        table or tree. If the opponent then plays the guessed reply, the
+        next get_move returns the ponder's move at once when the search
+        had finished, and goes on from the warmed-up table or tree when it
+        had not. Returns the guessed reply, None when there is none.
+        """
+        self.ponder_board = None
+        position = self.to_position(board_state)
+        reply = self.predict_reply(position)
+        if reply is None:
+            return None
+        position.make_move(*reply)
+        board = position.to_board_dict()
+        move = self.get_move(board)
+        self.ponder_board, self.ponder_move = board, move
+        self.ponder_finished = not self.should_stop()
+        return reply
+
+    def pondered_move(self, board_state):
+        """Return the move of a finished ponder of board_state, or None when the AI has to search."""
+        board, self.ponder_board = self.ponder_board, None
+        if board is None or not self.ponder_finished or self.ponder_move is None or board != board_state:
+            return None
+        self.move_source = 'ponder'
+        return self.ponder_move
+
+    def to_position(self, board_state):
+        """Return board_state as a bitboard Position to search on."""
+        settings = self.game.settings
+        return Position.from_board_dict(board_state, settings.rows, settings.cols)
+
+    def book_move(self, board_state):
+        """Return the opening book's move for board_state, or None when the AI has to search."""
+        if not self.use_book:
+            return None
+        path = book_path(self.game.settings)
+        book = open_book(path) if path else None
+        if book is None:
+            return None
+        position = self.to_position(board_state)
+        entry = book.probe(position, self.color)
+        # Only a legal move counts, two positions could share a key
+        if entry is None or entry[0] not in position.generate_moves(self.color):
+            return None
+        self.completed_depth = book.depth
+        self.move_source = 'book'
+        return entry[0]
+
+    def solve(self, position):
+        """Run the proof-number solver on position with the AI to move; returns (result, line)."""
+        settings = self.game.settings
+        if self.solver is None:
+            self.solver = ProofNumberSearch(settings.solver_nodes, settings.solver_table_mb,
+                                            settings.solver_second_level)
+            self.solver.should_stop = self.should_stop
+        return self.solver.solve(position, self.color)
+
+    def solved_move(self, board_state):
+        """
+        Return a move proven to win board_state, or None.
+
+        Only positions with at most solver_max_pieces pieces are tried, so
+        the solver's node budget is spent where it can finish.
+        """
+        self.proven_line = None
+        settings = self.game.settings
+        if not settings.solver_nodes:
+            return None
+        position = self.to_position(board_state)
+        if len(position) > settings.solver_max_pieces:
+            return None
+        result, line = self.solve(position)
+        if result != WIN or not line:
+            return None
+        self.proven_line = line
+        self.completed_depth = len(line)
+        self.move_source = 'solver'
+        return line[0]
\ No newline at end of file
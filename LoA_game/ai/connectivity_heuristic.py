@@ -1,3 +1,5 @@
+from game.position import Position
+
 class ConnectivityFirstHeuristic:
     def __init__(self, settings):
         self.settings = settings
@@ -21,6 +23,8 @@ class ConnectivityFirstHeuristic:
     def _connectivity_score(self, board, player, pieces):
         if len(pieces) == 1:
             return 1  # Single piece case
+        if isinstance(board, Position):
+            return max(group.bit_count() for group in board.groups(player)) / len(pieces)
             
         visited = set()
         largest_cluster = 0
@@ -1,3 +1,5 @@
+from game.position import Position
+
 class EnhancedHeuristic:
     def __init__(self, settings):
         self.settings = settings
@@ -34,6 +36,8 @@ class EnhancedHeuristic:
         """Calculate connectivity score (0-1)"""
         if len(pieces) == 1:
             return 1  # Single piece case
+        if isinstance(board, Position):
+            return max(group.bit_count() for group in board.groups(player)) / len(pieces)
             
         visited = set()
         largest_cluster = 0
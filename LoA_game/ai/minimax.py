@@ -1,5 +1,32 @@
 import random
+import time
 from ai.base_ai import BaseAI
+from ai import worker_pool
+from ai.move_ordering import MoveOrderer
+from ai.transposition import SharedTranspositionTable, TranspositionTable
+from engine.settings import engine_settings
+from engine.tablebase import DRAW, WIN
+from game.position import Position
+
+class SearchTimeout(Exception):
+    """Raised inside a search when the move's time budget runs out or the search is stopped."""
+
+
+def search_split(ai_class, settings, board_dict, color, slot, table_name, root_moves, depth, time_left):
+    """
+    Search a share of the root moves in a pool process, see MinimaxAI.search_root_moves.
+
+    Returns (score, move, exact, nodes, cutoffs, table hits), or None when the time ran out.
+    """
+    ai = worker_pool.worker_ai(ai_class, settings, color, slot)
+    ai.shared_alpha = worker_pool.shared_alpha
+    ai.cancel_token = worker_pool.cancel_event
+    ai.transposition_table = worker_pool.shared_table(table_name)
+    result = ai.search_root_moves(board_dict, root_moves, depth, time_left)
+    if result is None:
+        return None
+    return result + (ai.nodes_explored, ai.move_orderer.cutoffs, ai.transposition_table.hits)
+
 
 class MinimaxAI(BaseAI):
     def __init__(self, game, color):
@@ -8,14 +35,238 @@ class MinimaxAI(BaseAI):
         self.board = game.board.board_dict
         self.win_checker = game.win_checker
         self.moves = game.movement
+        self.transposition_table = TranspositionTable(self.settings.tt_size_mb)
+        self.shared_table = None  # The workers' table, made for the first parallel search
+        self.move_orderer = MoveOrderer()
+        self.time_budget = self.settings.ai_time_budget
+        self.max_depth = self.settings.ai_max_depth
+        self._deadline = None
+        self.workers = self.settings.ai_workers
+        self.root_score = None  # Score of the last finished iteration
+        self.root_best = None  # Best root move of the running iteration so far
+
+        # Set while a pool process searches its share of a root-split search:
+        # the root moves to search, the best root score of all the workers
+        # (a multiprocessing.Value) and whether the best score found is exact.
+        self.root_moves = None
+        self.shared_alpha = None
+        self.root_exact = True
+
+    def iterative_deepening(self, search):
+        """
+        Call search(depth) for depths 1, 2, ... until the time budget runs out.
+
+        Returns the best move of the deepest iteration that finished. Every
+        iteration leaves its best moves in the transposition table, where the
+        next, deeper one finds them and searches them first. Without a time
+        budget this is a single search at self.search_depth.
+
+        A search that is cancelled or passes its hard deadline stops at
+        once. When no iteration has finished by then, the best root move
+        the stopped one had found is returned, None if it had none.
+        """
+        if self.time_budget is None:
+            try:
+                self.root_score, move = search(self.search_depth)
+            except SearchTimeout:
+                if self.root_moves is not None:
+                    raise  # A worker's share, search_root_moves reports it
+                return self.root_best
+            self.completed_depth = self.search_depth
+            return move
+
+        start = time.perf_counter()
+        self._deadline = None  # The first iteration always finishes
+        best_move = None
+        try:
+            for depth in range(1, self.max_depth + 1):
+                try:
+                    score, move = search(depth)
+                except SearchTimeout:
+                    break
+                best_move = move
+                self.completed_depth = depth
+                self.root_score = score
+                if abs(score) >= 100000:
+                    break  # Forced result, deeper iterations won't change it
+                # The next iteration costs more than all earlier ones together
+                if (time.perf_counter() - start) * 2 > self.time_budget:
+                    break
+                self._deadline = start + self.time_budget
+        finally:
+            self._deadline = None
+        return best_move if best_move is not None else self.root_best
+
+    def parallel_search(self, board_state):
+        """
+        Iterative deepening with the root moves split over the worker pool.
+
+        At every depth the root moves, best first, are dealt out to the
+        workers in turn. Each worker searches its share to that depth,
+        raising its alpha to shared_alpha, the best score any worker has
+        found, so a worker skips moves another has already beaten. Returns
+        the best move of the deepest depth every worker finished; the
+        nodes of each worker are added up in worker_nodes.
+
+        The workers share one transposition table in shared memory, so what
+        one worker learns about a position the others find there, within
+        this move and for the next ones.
+        """
+        position = self.to_position(board_state)
+        root_moves = self.order_moves(position, self.color)
+        if not root_moves:
+            return None
+        settings = engine_settings(self.settings)
+        settings.ai_workers = 1
+        settings.opening_book = None  # The book and the solver were tried before the search
+        settings.solver_nodes = 0
+        settings.ai_hard_limit = None  # The workers are stopped from here, see worker_pool.gather
+        board_dict = dict(board_state)
+        pool = worker_pool.get_pool(self.workers)
+        self.worker_nodes = [0] * self.workers
+        if self.shared_table is None:
+            self.shared_table = SharedTranspositionTable(self.settings.tt_size_mb)
+        self.shared_table.new_search()
+
+        if self.time_budget is None:
+            depths = [self.search_depth]
+        else:
+            depths = range(1, self.max_depth + 1)
+        start = time.perf_counter()
+        best_move = None
+        for depth in depths:
+            # The first depth always finishes, like in iterative_deepening
+            time_left = None
+            if self.time_budget is not None and best_move is not None:
+                time_left = start + self.time_budget - time.perf_counter()
+            worker_pool.shared_alpha.value = float('-inf')
+            futures = [
+                pool.submit(search_split, type(self), settings, board_dict, self.color, slot,
+                            self.shared_table.name, root_moves[slot::self.workers], depth, time_left)
+                for slot in range(min(self.workers, len(root_moves)))
+            ]
+            results = worker_pool.gather(futures, self.should_stop)
+            for slot, result in enumerate(results):
+                if result is not None:
+                    self.worker_nodes[slot] += result[3]
+                    # Counted as this AI's own, its table and orderer sit idle meanwhile
+                    self.move_orderer.cutoffs += result[4]
+                    self.transposition_table.hits += result[5]
+            if None in results:
+                break  # Out of time or stopped, keep the last depth every worker finished
+
+            # A share whose every move failed low against another worker's
+            # alpha only has a bound, so exact scores win ties.
+            score, move = max(results, key=lambda result: (result[0], result[2]))[:2]
+            best_move = move
+            self.completed_depth = depth
+            self.root_score = score
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+            if abs(score) >= 100000:
+                break  # Forced result, deeper iterations won't change it
+            if self.time_budget is not None and (time.perf_counter() - start) * 2 > self.time_budget:
+                break
+        self.nodes_explored = sum(self.worker_nodes)
+        return best_move
+
+    def start_move(self):
+        super().start_move()
+        self.root_best = None
+        self.move_orderer.cutoffs = 0
+        self.transposition_table.hits = 0
+
+    def search_stats(self):
+        stats = super().search_stats()
+        stats['cutoffs'] = self.move_orderer.cutoffs
+        stats['tt_hits'] = self.transposition_table.hits
+        return stats
+
+    def search_root_moves(self, board_state, root_moves, depth, time_left):
+        """
+        Search only root_moves, to depth, as one worker of a parallel search.
+
+        Returns (score, move, exact) for the best of those moves, or None
+        when time_left seconds run out first. exact is False when the
+        score is only an upper bound because the move failed low against
+        shared_alpha.
+        """
+        self.root_moves = set(root_moves)
+        self.root_exact = True
+        saved = (self.search_depth, self.time_budget)
+        self.search_depth, self.time_budget = depth, None
+        self._deadline = None if time_left is None else time.perf_counter() + time_left
+        try:
+            move = self.get_move(board_state)
+        except SearchTimeout:
+            return None
+        finally:
+            self.search_depth, self.time_budget = saved
+            self._deadline = None
+            self.root_moves = None
+        return self.root_score, move, self.root_exact
+
+    def split_root_alpha(self, alpha):
+        """Return alpha raised to the best root score of all the workers, publishing alpha if it is higher."""
+        shared = self.shared_alpha
+        with shared.get_lock():
+            if alpha > shared.value:
+                shared.value = alpha
+                return alpha
+            return shared.value
+
+    def tablebase_score(self, board, player, side_to_move=None):
+        """
+        Return the exact score of board for player from the tablebase, or None when it isn't covered.
+
+        side_to_move defaults to player. A win in d plies scores 100000 - d,
+        so shorter wins score higher, a loss the negative of that. The root
+        is never probed, the search has to find its move.
+        """
+        if self.tablebase is None or not board.history or not self.tablebase.covers(board):
+            return None
+        side_to_move = side_to_move or player
+        result, distance = self.tablebase.probe(board, side_to_move)
+        if result == DRAW:
+            return 0
+        score = 100000 - distance
+        return score if (result == WIN) == (side_to_move == player) else -score
+
+    def check_deadline(self):
+        """Abort the running iteration once the time budget is spent or the search should stop, checked every 256 nodes."""
+        if self.nodes_explored & 255:
+            return
+        if self.should_stop() or (self._deadline is not None and time.perf_counter() >= self._deadline):
+            raise SearchTimeout()
+
+    def predict_reply(self, position):
+        """Return the reply the last search expected, from the table, or the opponent's first move in search order."""
+        opponent = 'W' if self.color == 'B' else 'B'
+        table = self.shared_table if self.workers > 1 and self.shared_table is not None else self.transposition_table
+        entry = table.probe(position.zobrist_key(opponent))
+        if entry is not None and entry[4] in position.generate_moves(opponent):
+            return entry[4]
+        moves = self.order_moves(position, opponent)
+        return moves[0] if moves else None
 
     def get_all_valid_moves(self, board, player):
-        valid_moves = {}
-        for pos in board:
-            if board[pos] == player:
-                valid_moves[pos] = self.moves.get_valid_moves(pos[0], pos[1])
+        position = board if isinstance(board, Position) else self.to_position(board)
+        valid_moves = {pos: [] for pos in position.squares(player)}
+        for from_pos, to_pos in self.moves.generate_moves(position, player):
+            valid_moves[from_pos].append(to_pos)
         return valid_moves
 
+    def order_moves(self, board, player, hash_move=None):
+        """Return the (piece, move) pairs of player on board in the order search should try them."""
+        valid_moves = self.get_all_valid_moves(board, player)
+        moves = [(piece, move) for piece, targets in valid_moves.items() for move in targets]
+        return self.move_orderer.order(moves, board, len(board.history), hash_move)
+
+    def new_search(self):
+        """Prepare the transposition table and move ordering for a new root search."""
+        self.transposition_table.new_search()
+        self.move_orderer.new_search()
+
     def random_evaluate(self, board, player):
         return random.randint(-100000, 100000)
 
@@ -78,8 +329,14 @@ class MinimaxAI(BaseAI):
 
             return len(clusters), clusters
 
-        np_clusters, p_clusters = analyze_clusters(board, player_positions)
-        no_clusters, o_clusters = analyze_clusters(board, opponent_positions)
+        if isinstance(board, Position):
+            # The position keeps its groups up to date, no need for a DFS
+            p_clusters = [group.bit_count() for group in board.groups(player)]
+            o_clusters = [group.bit_count() for group in board.groups(opponent)]
+            np_clusters, no_clusters = len(p_clusters), len(o_clusters)
+        else:
+            np_clusters, p_clusters = analyze_clusters(board, player_positions)
+            no_clusters, o_clusters = analyze_clusters(board, opponent_positions)
 
         if np_clusters == 1:
             return 100000  # Player wins
@@ -101,5 +358,8 @@ class MinimaxAI(BaseAI):
 
     def _move_piece_on_board(self, board, from_pos, to_pos):
         """Move a piece on the board without updating the visual representation."""
+        if isinstance(board, Position):
+            board.make_move(from_pos, to_pos)
+            return
         board[to_pos] = board[from_pos]
         del board[from_pos]
\ No newline at end of file
@@ -1,44 +1,103 @@
 from ai.minimax import MinimaxAI
+from ai.transposition import EXACT, LOWER_BOUND, UPPER_BOUND
 
 class AiModelA_AlphaBeta(MinimaxAI):
     def minimax(self, board, depth, maximizing_player, player, evalfunction, alpha=float('-inf'), beta=float('inf')):
         self.nodes_explored += 1
+        self.check_deadline()
+        opponent = "W" if player == "B" else "B"
+        side_to_move = player if maximizing_player else opponent
+
+        # Few pieces left: the tablebase has the exact result, at any depth
+        score = self.tablebase_score(board, player, side_to_move)
+        if score is not None:
+            return score, None
+
         if depth == 0 or self.win_checker.check_win("W", board) or self.win_checker.check_win("B", board):
             return evalfunction(board, player), None
 
-        valid_moves = self.get_all_valid_moves(board, player)
+        # The root of a worker's share of a parallel search: only some root
+        # moves are searched, so the table can't answer for the position
+        split_root = self.root_moves is not None and not board.history
+
+        # Reuse what an earlier visit of this position found
+        key = board.zobrist_key(side_to_move)
+        entry = self.transposition_table.probe(key)
+        tt_move = None
+        if entry is not None:
+            _, entry_depth, bound, score, tt_move, _ = entry
+            if entry_depth >= depth and not split_root:
+                if bound == EXACT:
+                    return score, tt_move
+                if bound == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                elif bound == UPPER_BOUND:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score, tt_move
+        alpha_orig, beta_orig = alpha, beta
+
+        moves = self.order_moves(board, side_to_move, tt_move)
+        if split_root:
+            moves = [candidate for candidate in moves if candidate in self.root_moves]
         best_move = None
 
         if maximizing_player:
-            max_eval = float('-inf')
-            for piece, moves in valid_moves.items():
-                for move in moves:
-                    new_board = board.copy()
-                    self._move_piece_on_board(new_board, piece, move)
-                    eval, _ = self.minimax(new_board, depth - 1, False, player, evalfunction, alpha, beta)
-                    if eval > max_eval:
-                        max_eval = eval
-                        best_move = (piece, move)
-                    alpha = max(alpha, eval)
-                    if beta <= alpha:
-                        break  # Alpha-beta cutoff
-            return max_eval, best_move
+            best_eval = float('-inf')
+            for piece, move in moves:
+                if split_root:
+                    alpha = self.split_root_alpha(alpha)
+                board.make_move(piece, move)
+                eval, _ = self.minimax(board, depth - 1, False, player, evalfunction, alpha, beta)
+                board.unmake_move()
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = (piece, move)
+                    if split_root:
+                        self.root_exact = eval > alpha
+                    elif not board.history:
+                        self.root_best = best_move
+                alpha = max(alpha, eval)
+                if beta <= alpha:
+                    self.move_orderer.record_cutoff((piece, move), len(board.history), depth)
+                    break  # Alpha-beta cutoff
+        else:
+            best_eval = float('inf')
+            for piece, move in moves:
+                board.make_move(piece, move)
+                eval, _ = self.minimax(board, depth - 1, True, player, evalfunction, alpha, beta)
+                board.unmake_move()
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = (piece, move)
+                beta = min(beta, eval)
+                if beta <= alpha:
+                    self.move_orderer.record_cutoff((piece, move), len(board.history), depth)
+                    break  # Alpha-beta cutoff
+
+        if split_root:
+            self.split_root_alpha(alpha)
+            return best_eval, best_move
+
+        if best_eval <= alpha_orig:
+            bound = UPPER_BOUND
+        elif best_eval >= beta_orig:
+            bound = LOWER_BOUND
         else:
-            min_eval = float('inf')
-            for piece, moves in valid_moves.items():
-                for move in moves:
-                    new_board = board.copy()
-                    self._move_piece_on_board(new_board, piece, move)
-                    eval, _ = self.minimax(new_board, depth - 1, True, player, evalfunction, alpha, beta)
-                    if eval < min_eval:
-                        min_eval = eval
-                        best_move = (piece, move)
-                    beta = min(beta, eval)
-                    if beta <= alpha:
-                        break  # Alpha-beta cutoff
-            return min_eval, best_move
+            bound = EXACT
+        self.transposition_table.store(key, depth, bound, best_eval, best_move)
+        return best_eval, best_move
         
     def get_move(self, board_state, evalfunction) -> tuple[tuple[int, int], tuple[int, int]]:
-        """Return the best move based on plain minimax."""
-        _, best_move = self.minimax(board_state, depth=self.search_depth, maximizing_player=True, player=self.color, evalfunction=evalfunction)
-        return best_move
\ No newline at end of file
+        """Return the best move based on iterative deepening minimax with alpha-beta pruning."""
+        self.start_move()
+        move = self.pondered_move(board_state) or self.book_move(board_state) or self.solved_move(board_state)
+        if move is not None:
+            return move
+        if self.workers > 1:
+            return self.parallel_search(board_state)
+        self.new_search()
+        position = self.to_position(board_state)
+        return self.iterative_deepening(
+            lambda depth: self.minimax(position, depth=depth, maximizing_player=True, player=self.color, evalfunction=evalfunction)
+        )
\ No newline at end of file
@@ -13,9 +13,9 @@ class AiModelA_NoPruning(MinimaxAI):
             max_eval = float('-inf')
             for piece, moves in valid_moves.items():
                 for move in moves:
-                    new_board = board.copy()
-                    self._move_piece_on_board(new_board, piece, move)
-                    eval, _ = self.minimax(new_board, depth - 1, False, player, evalfunction)
+                    board.make_move(piece, move)
+                    eval, _ = self.minimax(board, depth - 1, False, player, evalfunction)
+                    board.unmake_move()
                     if eval > max_eval:
                         max_eval = eval
                         best_move = (piece, move)
@@ -25,9 +25,9 @@ class AiModelA_NoPruning(MinimaxAI):
             opponent = "W" if player == "B" else "B"
             for piece, moves in valid_moves.items():
                 for move in moves:
-                    new_board = board.copy()
-                    self._move_piece_on_board(new_board, piece, move)
-                    eval, _ = self.minimax(new_board, depth - 1, True, player, evalfunction)
+                    board.make_move(piece, move)
+                    eval, _ = self.minimax(board, depth - 1, True, player, evalfunction)
+                    board.unmake_move()
                     if eval < min_eval:
                         min_eval = eval
                         best_move = (piece, move)
@@ -35,5 +35,5 @@ class AiModelA_NoPruning(MinimaxAI):
     
     def get_move(self, board_state, evalfunction) -> tuple[tuple[int, int], tuple[int, int]]:
         """Return the best move based on plain minimax."""
-        _, best_move = self.minimax(board_state, depth=self.search_depth, maximizing_player=True, player=self.color, evalfunction=evalfunction)
+        _, best_move = self.minimax(self.to_position(board_state), depth=self.search_depth, maximizing_player=True, player=self.color, evalfunction=evalfunction)
         return best_move
\ No newline at end of file
@@ -0,0 +1,68 @@
+HASH_MOVE_SCORE = 3_000_000
+KILLER_SCORE = 2_000_000
+CAPTURE_BONUS = 0.5  # Breaks ties between moves with the same history score
+
+
+class MoveOrderer:
+    """
+    Orders moves for alpha-beta search.
+
+    The hash (transposition table or principal variation) move comes first,
+    then the killer moves of the ply, then every other move by its history
+    score, with captures ahead of quiet moves of equal score. Captures are
+    not put ahead of killers: in Lines of Action taking a piece leaves the
+    opponent fewer pieces to connect, and the evaluations score it that way.
+
+    The history table lives as long as the AI, that is for one game, while
+    the killers are reset for every search.
+    """
+
+    def __init__(self, killers_per_ply=2):
+        self.killers_per_ply = killers_per_ply
+        self.killers = []  # killers[ply] is a short list of moves that caused cutoffs
+        self.history = {}  # (piece, move) -> accumulated depth * depth of its cutoffs
+        self.cutoffs = 0  # Cutoffs recorded, reset by the AI for every move
+
+    def new_search(self):
+        """Drop the killers and age the history scores before a new root search."""
+        self.killers = []
+        for move in list(self.history):
+            score = self.history[move] >> 1
+            if score:
+                self.history[move] = score
+            else:
+                del self.history[move]
+
+    def order(self, moves, board, ply, hash_move=None):
+        """
+        Return moves, a list of (piece, move) pairs, best candidates first.
+
+        Args:
+            board: The position the moves are played from, used to spot captures.
+            ply: Distance from the root, selects the killer slot.
+            hash_move: Move stored for this position by an earlier search.
+        """
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+
+        def score(candidate):
+            if candidate == hash_move:
+                return HASH_MOVE_SCORE
+            if candidate in killers:
+                return KILLER_SCORE
+            if candidate[1] in board:  # Landing on a piece is always a capture
+                return history.get(candidate, 0) + CAPTURE_BONUS
+            return history.get(candidate, 0)
+
+        return sorted(moves, key=score, reverse=True)
+
+    def record_cutoff(self, move, ply, depth):
+        """Remember a move that caused a beta cutoff at the given ply and remaining depth."""
+        self.cutoffs += 1
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.killers_per_ply:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
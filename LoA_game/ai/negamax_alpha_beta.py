@@ -1,37 +1,92 @@
 from ai.minimax import MinimaxAI
+from ai.transposition import EXACT, LOWER_BOUND, UPPER_BOUND
 
 class NegamaxAlphaBeta(MinimaxAI):
     def negamax(self, board, depth, player, evalfunction, alpha=float('-inf'), beta=float('inf')):
         self.nodes_explored += 1
         """Negamax with Alpha-Beta Pruning."""
+        self.check_deadline()
         opponent = "W" if player == "B" else "B"
 
+        # Few pieces left: the tablebase has the exact result, at any depth
+        score = self.tablebase_score(board, player)
+        if score is not None:
+            return score, None
+
         if depth == 0 or self.win_checker.check_win(player, board) or self.win_checker.check_win(opponent, board):
             return evalfunction(board, player), None
 
-        valid_moves = self.get_all_valid_moves(board, player)
+        # The root of a worker's share of a parallel search: only some root
+        # moves are searched, so the table can't answer for the position
+        split_root = self.root_moves is not None and not board.history
+
+        # Reuse what an earlier visit of this position found
+        key = board.zobrist_key(player)
+        entry = self.transposition_table.probe(key)
+        tt_move = None
+        if entry is not None:
+            _, entry_depth, bound, score, tt_move, _ = entry
+            if entry_depth >= depth and not split_root:
+                if bound == EXACT:
+                    return score, tt_move
+                if bound == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                elif bound == UPPER_BOUND:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score, tt_move
+        alpha_orig = alpha
+
+        moves = self.order_moves(board, player, tt_move)
+        if split_root:
+            moves = [candidate for candidate in moves if candidate in self.root_moves]
         best_value = float('-inf')
         best_move = None
 
-        for piece, moves in valid_moves.items():
-            for move in moves:
-                new_board = board.copy()
-                self._move_piece_on_board(new_board, piece, move)
+        for piece, move in moves:
+            if split_root:
+                alpha = self.split_root_alpha(alpha)
+            board.make_move(piece, move)
+            nega_val, _ = self.negamax(board, depth - 1, opponent, evalfunction, -beta, -alpha)
+            board.unmake_move()
+            nega_val = -nega_val
 
-                nega_val, _ = self.negamax(new_board, depth - 1, opponent, evalfunction, -beta, -alpha)
-                nega_val = -nega_val
+            if nega_val > best_value:
+                best_value = nega_val
+                best_move = (piece, move)
+                if split_root:
+                    self.root_exact = nega_val > alpha
+                elif not board.history:
+                    self.root_best = best_move
 
-                if nega_val > best_value:
-                    best_value = nega_val
-                    best_move = (piece, move)
+            alpha = max(alpha, best_value)
+            if alpha >= beta:
+                self.move_orderer.record_cutoff((piece, move), len(board.history), depth)
+                break
 
-                alpha = max(alpha, best_value)
-                if alpha >= beta:
-                    break
+        if split_root:
+            self.split_root_alpha(alpha)
+            return best_value, best_move
 
+        if best_value <= alpha_orig:
+            bound = UPPER_BOUND
+        elif best_value >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.transposition_table.store(key, depth, bound, best_value, best_move)
         return best_value, best_move
     
     def get_move(self, board_state, evalfunction) -> tuple[tuple[int, int], tuple[int, int]]:
-        """Return the best move based on negamax with alpha-beta pruning."""
-        _, best_move = self.negamax(board_state, depth=self.search_depth, player=self.color, evalfunction=evalfunction)
-        return best_move
+        """Return the best move based on iterative deepening negamax with alpha-beta pruning."""
+        self.start_move()
+        move = self.pondered_move(board_state) or self.book_move(board_state) or self.solved_move(board_state)
+        if move is not None:
+            return move
+        if self.workers > 1:
+            return self.parallel_search(board_state)
+        self.new_search()
+        position = self.to_position(board_state)
+        return self.iterative_deepening(
+            lambda depth: self.negamax(position, depth=depth, player=self.color, evalfunction=evalfunction)
+        )
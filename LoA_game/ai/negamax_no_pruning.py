@@ -14,10 +14,9 @@ class Negamax(MinimaxAI):
 
         for piece, moves in valid_moves.items():
             for move in moves:
-                new_board = board.copy()
-                self._move_piece_on_board(new_board, piece, move)
-
-                nega_val, _ = self.negamax(new_board, depth - 1, opponent, evalfunction)
+                board.make_move(piece, move)
+                nega_val, _ = self.negamax(board, depth - 1, opponent, evalfunction)
+                board.unmake_move()
                 nega_val = -nega_val
 
                 if nega_val > best_value:
@@ -28,5 +27,5 @@ class Negamax(MinimaxAI):
     
     def get_move(self, board_state, evalfunction) -> tuple[tuple[int, int], tuple[int, int]]:
         """Return the best move based on negamax without pruning."""
-        _, best_move = self.negamax(board_state, depth=self.search_depth, player=self.color, evalfunction=evalfunction)
+        _, best_move = self.negamax(self.to_position(board_state), depth=self.search_depth, player=self.color, evalfunction=evalfunction)
         return best_move
\ No newline at end of file
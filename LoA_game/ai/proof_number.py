@@ -0,0 +1,188 @@
+"""
+Proof-number search: an endgame solver that proves a position won or lost.
+
+The tree is grown best first. Every node has a proof number, the fewest
+leaves that must be proven to show the side to move wins, and a disproof
+number, the fewest that must be proven to show it loses. Both are counted
+for the side to move at the node, so a node's proof number is the least
+disproof number of its children and its disproof number is the sum of
+their proof numbers. Each step expands the most-proving leaf, found by
+always following the child whose disproof number equals its parent's
+proof number, and updates the numbers back to the root.
+
+With second_level set this is PN²: every leaf that is expanded gets a
+small proof-number search of its own, whose numbers its children keep
+while their subtrees are thrown away. The tree that is kept grows by one
+level per expansion but is better informed.
+
+Solved positions go into a TranspositionTable, bounded and overwritten
+like the search table, so later searches pick them up without growing
+the tree again.
+"""
+
+from ai.transposition import EXACT, TranspositionTable
+
+WIN = 1
+LOSS = -1
+UNKNOWN = 0
+
+INFINITY = 1 << 40  # Proof number of a position that can't be proven
+MAX_LINE = 200  # Moves of a proven line followed through the table
+
+
+class ProofNumberNode:
+    __slots__ = ('parent', 'move', 'children', 'proof', 'disproof')
+
+    def __init__(self, parent=None, move=None):
+        self.parent = parent
+        self.move = move
+        self.children = []
+        self.proof = 1
+        self.disproof = 1
+
+    def update(self):
+        """Work out the numbers from the children."""
+        self.proof = min(child.disproof for child in self.children)
+        self.disproof = min(sum(child.proof for child in self.children), INFINITY)
+
+    def solved(self):
+        return self.proof == 0 or self.disproof == 0
+
+
+class ProofNumberSearch:
+    """Proves positions won or lost for the side to move within a node budget."""
+
+    def __init__(self, max_nodes, table_mb=4, second_level=0):
+        """
+        Args:
+            max_nodes: Nodes one search may create before it gives up.
+            table_mb: Memory cap of the table of solved positions.
+            second_level: Node budget of the PN² search at each expanded leaf, 0 for plain PN.
+        """
+        self.max_nodes = max_nodes
+        self.second_level = second_level
+        self.table = TranspositionTable(table_mb)
+        self.nodes = 0
+        self.should_stop = None  # Called before every expansion, the search gives up once it returns True
+
+    def solve(self, position, player):
+        """
+        Return (result, line) for position with player to move.
+
+        result is WIN or LOSS for player, or UNKNOWN when the node budget
+        ran out first. line holds the moves of the proof, winning moves for
+        the winner and a defence for the loser, as far as the tree and the
+        table still hold them; it is empty for UNKNOWN.
+        """
+        self.nodes = 0
+        self.table.new_search()
+        root = ProofNumberNode()
+        self._evaluate(root, position, player)
+        self._search(root, position, player, self.max_nodes, self.second_level)
+        if root.proof == 0:
+            return WIN, self._line(root, position, player)
+        if root.disproof == 0:
+            return LOSS, self._line(root, position, player)
+        return UNKNOWN, []
+
+    def _search(self, root, position, player, budget, second_level):
+        """Expand leaves below root until it is solved or self.nodes reaches budget."""
+        while not root.solved() and self.nodes < budget:
+            if self.should_stop is not None and self.should_stop():
+                break
+            # Down to the most-proving leaf
+            node, side = root, player
+            while node.children:
+                node = min(node.children, key=lambda child: child.disproof)
+                position.make_move(*node.move)
+                side = _opponent(side)
+
+            self._expand(node, position, side, second_level)
+
+            # Back up to root, storing what got solved on the way
+            while True:
+                if node.children:
+                    node.update()
+                if node.solved():
+                    self._store(node, position, side)
+                if node is root:
+                    break
+                position.unmake_move()
+                node = node.parent
+                side = _opponent(side)
+
+    def _expand(self, node, position, side, second_level):
+        opponent = _opponent(side)
+        moves = position.generate_moves(side)
+        if not moves:
+            node.proof, node.disproof = INFINITY, 0  # A side that can't move has lost
+            return
+        for move in moves:
+            child = ProofNumberNode(node, move)
+            position.make_move(*move)
+            self._evaluate(child, position, opponent)
+            position.unmake_move()
+            node.children.append(child)
+            self.nodes += 1
+            if child.disproof == 0:
+                break  # A winning move, the others don't matter
+        if second_level:
+            node.update()
+            self._search(node, position, side, self.nodes + second_level, 0)
+            for child in node.children:
+                if not child.solved():
+                    child.children = []
+
+    def _evaluate(self, node, position, side):
+        """Set the numbers of a new leaf: solved when the game is over or the table knows it."""
+        # White is checked first, as the game does when both sides are connected
+        if position.is_connected('W'):
+            winner = 'W'
+        elif position.is_connected('B'):
+            winner = 'B'
+        else:
+            entry = self.table.probe(position.zobrist_key(side))
+            if entry is None:
+                return
+            winner = side if entry[3] == WIN else _opponent(side)
+        if winner == side:
+            node.proof, node.disproof = 0, INFINITY
+        else:
+            node.proof, node.disproof = INFINITY, 0
+
+    def _store(self, node, position, side):
+        """Store a solved node in the table and drop its children but the one the line needs."""
+        if node.children:
+            if node.proof == 0:
+                node.children = [min(node.children, key=lambda child: child.disproof)]
+            else:
+                node.children = node.children[:1]
+        move = node.children[0].move if node.children else None
+        self.table.store(position.zobrist_key(side), 0, EXACT, WIN if node.proof == 0 else LOSS, move)
+
+    def _line(self, root, position, player):
+        """Return the moves of the proof from root, followed through the tree, then the table."""
+        line = []
+        node, side = root, player
+        while len(line) < MAX_LINE:
+            if node is not None and node.children:
+                node = node.children[0]
+                move = node.move
+            else:
+                if position.is_connected('W') or position.is_connected('B'):
+                    break
+                node = None
+                entry = self.table.probe(position.zobrist_key(side))
+                if entry is None or entry[4] is None:
+                    break
+                move = entry[4]
+            line.append(move)
+            position.make_move(*move)
+            side = _opponent(side)
+        for _ in line:
+            position.unmake_move()
+        return line
+
+
+def _opponent(side):
+    return 'W' if side == 'B' else 'B'
@@ -0,0 +1,171 @@
+import struct
+import weakref
+from multiprocessing import shared_memory
+
+EXACT = 0
+LOWER_BOUND = 1  # The score failed high, the real value is at least this
+UPPER_BOUND = 2  # The score failed low, the real value is at most this
+
+
+class TranspositionTable:
+    """A fixed-size table of search results keyed by Position.zobrist_key."""
+
+    # Rough memory cost of one slot holding an entry tuple.
+    ENTRY_BYTES = 160
+
+    def __init__(self, size_mb):
+        """
+        Allocate the table.
+
+        Args:
+            size_mb: Memory cap in megabytes. The slot count is the largest power
+                of two that fits, so a key maps to its slot with a mask.
+        """
+        slots = max(1, int(size_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.size = 1 << (slots.bit_length() - 1)
+        self.mask = self.size - 1
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+
+    def new_search(self):
+        """Age the stored entries; call once before each root search."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+
+    def probe(self, key):
+        """Return the (key, depth, bound, score, move, generation) entry for key, or None."""
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Store a search result.
+
+        A slot is overwritten when it is empty, holds the same position, was
+        written by an earlier search, or holds a result that is not deeper.
+        """
+        index = key & self.mask
+        old = self.entries[index]
+        if old is None or old[0] == key or old[5] != self.generation or depth >= old[1]:
+            self.entries[index] = (key, depth, bound, score, move, self.generation)
+
+
+def _release(memory, unlink):
+    memory.close()
+    if unlink:
+        memory.unlink()
+
+
+class SharedTranspositionTable:
+    """
+    A TranspositionTable kept in shared memory, so the worker processes of
+    a parallel search read and write one table without copying it.
+
+    Only the root-split alpha-beta search (MinimaxAI.parallel_search) uses
+    it. MCTS workers grow separate trees and share no table: their playouts
+    end on random positions that almost never repeat, so a shared cache of
+    evaluations would cost a probe per playout and hardly ever hit.
+
+    The process that creates the table owns it: it ages and clears the
+    entries and frees the memory when the table is dropped. Workers attach
+    to it by name.
+
+    Each slot is a packed 24-byte record: a check word, the score, the
+    depth, the bound, the generation and the move's four coordinates. The
+    check word is the key xored with both payload words. Processes write
+    without locks, and a record torn by two writers at once fails the key
+    check and reads as a miss.
+    """
+
+    HEADER = struct.Struct('<QB')  # Slot count, generation
+    RECORD = struct.Struct('<QdhBB4B')  # Check, score, depth, bound + 1 (0 is empty), generation, move
+    PAYLOAD = struct.Struct('<dhBB4B')
+    WORDS = struct.Struct('<QQQ')
+    ENTRY_BYTES = RECORD.size
+    NO_MOVE = (255, 255, 255, 255)
+
+    def __init__(self, size_mb=None, name=None):
+        """
+        Create a table of at most size_mb megabytes, or attach to the table called name.
+        """
+        if name is None:
+            slots = max(1, int(size_mb * 1024 * 1024) // self.ENTRY_BYTES)
+            slots = 1 << (slots.bit_length() - 1)
+            self.memory = shared_memory.SharedMemory(create=True, size=self.HEADER.size + slots * self.ENTRY_BYTES)
+            self.memory.buf[:self.memory.size] = bytes(self.memory.size)
+            self.HEADER.pack_into(self.memory.buf, 0, slots, 0)
+            self.owner = True
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.memory.name
+        self.size, self.generation = self.HEADER.unpack_from(self.memory.buf, 0)
+        self.mask = self.size - 1
+        self.hits = 0
+        self._finalizer = weakref.finalize(self, _release, self.memory, self.owner)
+
+    @classmethod
+    def attach(cls, name):
+        """Return a view of the shared table called name."""
+        return cls(name=name)
+
+    def close(self):
+        """Stop using the table; the owner also frees the shared memory."""
+        self._finalizer()
+
+    def new_search(self):
+        """Age the stored entries (owner), or pick up the owner's current generation (workers)."""
+        if self.owner:
+            self.generation = (self.generation + 1) & 0xFF
+            self.HEADER.pack_into(self.memory.buf, 0, self.size, self.generation)
+        else:
+            self.generation = self.HEADER.unpack_from(self.memory.buf, 0)[1]
+
+    def clear(self):
+        if self.owner:
+            start = self.HEADER.size
+            self.memory.buf[start:start + self.size * self.ENTRY_BYTES] = bytes(self.size * self.ENTRY_BYTES)
+            self.generation = 0
+            self.HEADER.pack_into(self.memory.buf, 0, self.size, 0)
+        self.hits = 0
+
+    def _read(self, key):
+        """Return the fields of key's slot as a tuple, or None when the slot holds another key or is torn."""
+        offset = self.HEADER.size + (key & self.mask) * self.ENTRY_BYTES
+        record = self.memory.buf[offset:offset + self.ENTRY_BYTES].tobytes()  # One snapshot
+        check, first, second = self.WORDS.unpack(record)
+        if check ^ first ^ second != key:
+            return None
+        return self.RECORD.unpack(record)
+
+    def probe(self, key):
+        """Return the (key, depth, bound, score, move, generation) entry for key, or None."""
+        record = self._read(key)
+        if record is None or not record[3]:
+            return None
+        _, score, depth, bound, generation, from_row, from_col, to_row, to_col = record
+        move = None if from_row == 255 else ((from_row, from_col), (to_row, to_col))
+        self.hits += 1
+        return key, depth, bound - 1, score, move, generation
+
+    def store(self, key, depth, bound, score, move):
+        """Store a search result, with the replacement rule of TranspositionTable."""
+        offset = self.HEADER.size + (key & self.mask) * self.ENTRY_BYTES
+        record = self.memory.buf[offset:offset + self.ENTRY_BYTES].tobytes()
+        old = self.RECORD.unpack(record)
+        if old[3] and old[4] == self.generation and depth < old[2]:
+            check, first, second = self.WORDS.unpack(record)
+            if check ^ first ^ second != key:
+                return  # A deeper result for another position of this search
+        squares = self.NO_MOVE if move is None else (move[0][0], move[0][1], move[1][0], move[1][1])
+        payload = self.PAYLOAD.pack(score, depth, bound + 1, self.generation, *squares)
+        check = key ^ int.from_bytes(payload[:8], 'little') ^ int.from_bytes(payload[8:], 'little')
+        self.memory.buf[offset:offset + self.ENTRY_BYTES] = check.to_bytes(8, 'little') + payload
@@ -0,0 +1,113 @@
+"""
+The pool of worker processes the AIs spread their searches over.
+
+The pool is started on first use and kept for the rest of the program, so
+a move does not pay for starting processes. In the game the pool lives in
+the engine process (engine/engine_process.py), which runs the searches.
+Workers are spawned rather than forked: the processes that start pools
+run threads, the executor's own and, when the AI is called from the game's
+process, the engine reader and telemetry threads, and forking a process
+with threads is unsafe. Spawned workers also start clean, without the
+caller's modules or state.
+
+The pool serves one search at a time. Every worker also gets shared_alpha,
+the best root score found so far by any worker of a root-split alpha-beta
+search, and cancel_event, set while the search is being stopped, through
+the pool initializer.
+"""
+
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from ai.transposition import SharedTranspositionTable
+from engine.game import HeadlessGame
+
+_pool = None
+_pool_workers = 0
+shared_alpha = None  # multiprocessing.Value('d'), in the parent and in every worker
+cancel_event = None  # multiprocessing.Event, the workers' cancel token, see gather
+POLL_SECONDS = 0.05  # How often gather asks whether the search should stop
+
+# AIs kept by a pool process between moves, by (AI class, color, slot), so
+# each slot's tree or transposition table carries over to the next task.
+_worker_ais = {}
+
+# The shared transposition table a pool process is attached to. One at a
+# time, so a long session doesn't pile up mappings of old tables.
+_shared_table = None
+
+
+def _init_worker(alpha, cancel):
+    global shared_alpha, cancel_event
+    shared_alpha = alpha
+    cancel_event = cancel
+
+
+def get_pool(workers):
+    """Return the shared pool, restarted if it has a different number of workers."""
+    global _pool, _pool_workers, shared_alpha, cancel_event
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        context = multiprocessing.get_context('spawn')
+        shared_alpha = context.Value('d', float('-inf'))
+        cancel_event = context.Event()
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                    initializer=_init_worker, initargs=(shared_alpha, cancel_event))
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    """Stop the worker processes, if any are running."""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def gather(futures, should_stop):
+    """
+    Return the results of the workers' futures, in order.
+
+    While they run, should_stop() is asked every POLL_SECONDS; once it
+    returns True cancel_event is set, and the workers' searches, which
+    check it, stop early and return what they have.
+    """
+    pending = set(futures)
+    try:
+        while pending:
+            _, pending = wait(pending, timeout=POLL_SECONDS)
+            if pending and should_stop():
+                cancel_event.set()
+        return [future.result() for future in futures]
+    finally:
+        cancel_event.clear()
+
+
+def worker_ai(ai_class, settings, color, slot):
+    """
+    Return the AI a pool process keeps for slot, building it on a headless game.
+
+    The AI is rebuilt when the settings change, e.g. for a new board size.
+    """
+    key = (ai_class, color, slot)
+    ai = _worker_ais.get(key)
+    if ai is None or vars(ai.game.settings) != vars(settings):
+        ai = ai_class(HeadlessGame(settings), color)
+        _worker_ais[key] = ai
+    return ai
+
+
+def shared_table(name):
+    """Return this process's view of the shared transposition table called name."""
+    global _shared_table
+    if _shared_table is None or _shared_table.name != name:
+        if _shared_table is not None:
+            _shared_table.close()
+        _shared_table = SharedTranspositionTable.attach(name)
+    _shared_table.new_search()  # Pick up the owner's generation
+    return _shared_table
+
+
+atexit.register(shutdown_pool)
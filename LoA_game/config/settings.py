@@ -1,18 +1,18 @@
 import pygame
+from engine.settings import EngineSettings
 
-class Settings:
-    """A class to store all settings for Lines of Action."""
+class Settings(EngineSettings):
+    """A class to store all settings for Lines of Action, the engine's plus the display's."""
 
     def __init__(self):
         """Initialize the game's settings."""
+        super().__init__()
 
         # Screen settings
         self.screen_width = int((2/3)*pygame.display.Info().current_h)
         self.screen_height = self.screen_width
 
         # Board settings
-        self.rows = 8
-        self.cols = 8
         self.square_size = self.screen_width // self.cols
         self.light_color = (238, 238, 210)
         self.dark_color = (233,116,81)
@@ -21,14 +21,6 @@ class Settings:
         self.button_width = 2.5* self.square_size
         self.button_height = self.square_size // 2
 
-        # Movement Settings
-        self.directions = [
-            (1, 0), (-1, 0),  # Horizontal (Right, Left)
-            (0, 1), (0, -1),  # Vertical (Down, Up)
-            (1, 1), (-1, -1), # Diagonal (Bottom-right, Top-left)
-            (1, -1), (-1, 1)  # Diagonal (Bottom-left, Top-right)
-        ]
-
         # Piece settings
         self.piece_size = (self.square_size, self.square_size)
         self.white_piece = 'images/white_checker.bmp'
@@ -52,3 +44,5 @@ class Settings:
         ]
         # Game settings
         self.fps = 60
+        self.telemetry_file = 'telemetry.jsonl'  # Every game and AI move as JSON lines, None for no file
+        self.ponder = True  # The AI searches ahead during the human's turn
@@ -0,0 +1,51 @@
+"""
+The Lines of Action engine without pygame.
+
+Settings, positions, move generation, win checking and every AI can be
+imported from here on a machine without a display.
+"""
+
+from engine.settings import EngineSettings
+from engine.game import HeadlessBoard, HeadlessGame, initial_board
+from game.position import Position
+from game.movement import LOAMovement
+from game.win_check import WinChecker
+
+_AI_NAMES = (
+    'MinimaxSimple',
+    'MinimaxBetter',
+    'Random',
+    'NegamaxSimple',
+    'NegamaxBetter',
+    'MCTSCenterMass',
+    'MCTSEnhanced',
+    'MCTSConnectivity'
+)
+
+
+def __getattr__(name):
+    # The AI modules import engine modules themselves, so the AI classes are
+    # loaded on first use rather than while this package is initialized.
+    if name in _AI_NAMES:
+        import ai.all_ai
+        return getattr(ai.all_ai, name)
+    raise AttributeError(f"module 'engine' has no attribute {name!r}")
+
+
+__all__ = [
+    'EngineSettings',
+    'HeadlessBoard',
+    'HeadlessGame',
+    'initial_board',
+    'Position',
+    'LOAMovement',
+    'WinChecker',
+    'MinimaxSimple',
+    'MinimaxBetter',
+    'Random',
+    'NegamaxSimple',
+    'NegamaxBetter',
+    'MCTSCenterMass',
+    'MCTSEnhanced',
+    'MCTSConnectivity'
+]
@@ -0,0 +1,272 @@
+"""
+Perft counts and speed benchmarks for the engine.
+
+    python -m engine.benchmark
+    python -m engine.benchmark --save results.json
+    python -m engine.benchmark --baseline benchmarks/baseline.json
+
+Perft counts the move sequences of a given length from a fixed position,
+for every board size from 6 to 10. PERFT holds the counts the rules give;
+the tests check them against the bitboard and the board dict move
+generators, and the benchmark counts them again and fails on a mismatch,
+so a change that breaks move legality shows up at once.
+
+The speed benchmarks time move generation, make and unmake, WinChecker
+and every heuristic over a fixed set of positions and report calls per
+second. The results print as a table, --save writes them as JSON and
+--baseline compares them with a saved run, failing when a number drops by
+more than --tolerance.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from engine.game import HeadlessGame, initial_board
+from engine.settings import EngineSettings
+from game.position import Position
+
+SIZES = (6, 7, 8, 9, 10)
+PERFT_DEPTH = 3
+
+# Perft counts to depths 1 to 4 from each size's benchmark positions.
+PERFT = {
+    6: {'start': [24, 524, 11440, 234560], 'middle': [19, 366, 6661, 131537]},
+    7: {'start': [30, 848, 25012, 698880], 'middle': [20, 651, 13568, 402160]},
+    8: {'start': [36, 1244, 44952, 1563208], 'middle': [39, 1241, 46516, 1432174]},
+    9: {'start': [42, 1712, 72836, 3008240], 'middle': [35, 1428, 52625, 2115932]},
+    10: {'start': [48, 2252, 110056, 5254632], 'middle': [51, 2560, 131101, 6541328]},
+}
+
+
+def _opponent(side):
+    return 'W' if side == 'B' else 'B'
+
+
+def benchmark_positions(size):
+    """
+    Return {name: (board_dict, side to move)} for a board size.
+
+    'start' is the starting position. 'middle' follows from it by ten
+    moves picked with a seeded generator from the sorted legal moves, so
+    it doesn't depend on the order moves are generated in.
+    """
+    start = initial_board(size, size)
+    position = Position.from_board_dict(start, size, size)
+    rng = random.Random(size)
+    side = 'B'
+    for _ in range(10):
+        moves = sorted(position.generate_moves(side))
+        position.make_move(*moves[rng.randrange(len(moves))])
+        side = _opponent(side)
+        if position.is_connected('W') or position.is_connected('B'):
+            break
+    return {'start': (start, 'B'), 'middle': (position.to_board_dict(), side)}
+
+
+def perft(position, side, depth):
+    """
+    Return the number of move sequences of length depth from position.
+
+    A position where a side is connected is over: it counts as a sequence
+    only when it is at the full depth. The last level is counted from the
+    move list, without playing the moves.
+    """
+    if depth == 0:
+        return 1
+    if position.is_connected('W') or position.is_connected('B'):
+        return 0
+    moves = position.generate_moves(side)
+    if depth == 1:
+        return len(moves)
+    count = 0
+    opponent = _opponent(side)
+    for move in moves:
+        position.make_move(*move)
+        count += perft(position, opponent, depth - 1)
+        position.unmake_move()
+    return count
+
+
+def perft_reference(game, board_dict, side, depth):
+    """perft on a board dict, with the dict code of LOAMovement and WinChecker."""
+    if depth == 0:
+        return 1
+    if game.win_checker.check_win('W', board_dict) or game.win_checker.check_win('B', board_dict):
+        return 0
+    moves = [(pos, target) for pos, piece in list(board_dict.items()) if piece == side
+             for target in game.movement.get_valid_moves(pos[0], pos[1], board_dict)]
+    if depth == 1:
+        return len(moves)
+    count = 0
+    for from_pos, to_pos in moves:
+        child = dict(board_dict)
+        child[to_pos] = child.pop(from_pos)
+        count += perft_reference(game, child, _opponent(side), depth - 1)
+    return count
+
+
+def sample_positions(size, count=20, seed=0):
+    """Return count (Position, side to move) pairs from seeded random games, a few to thirty moves in."""
+    rng = random.Random(seed)
+    samples = []
+    while len(samples) < count:
+        position = Position.from_board_dict(initial_board(size, size), size, size)
+        side = 'B'
+        for _ in range(rng.randint(2, 30)):
+            moves = sorted(position.generate_moves(side))
+            position.make_move(*moves[rng.randrange(len(moves))])
+            side = _opponent(side)
+            if position.is_connected('W') or position.is_connected('B'):
+                break
+        else:
+            samples.append((Position.from_board_dict(position.to_board_dict(), size, size), side))
+    return samples
+
+
+def _rate(call, samples, min_time, rounds=5):
+    """
+    Return calls per second of call(position, side) over samples.
+
+    The samples are run over for rounds rounds of min_time / rounds
+    seconds each, and the fastest round counts: the others were slowed by
+    whatever else the machine was doing.
+    """
+    best = 0.0
+    for _ in range(rounds):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            for position, side in samples:
+                call(position, side)
+            calls += len(samples)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / rounds:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+
+def speed(size, min_time=0.5):
+    """Return {benchmark: calls per second} for a board size."""
+    import engine
+    from ai.connectivity_heuristic import ConnectivityFirstHeuristic
+    from ai.enhanced_heuristic import EnhancedHeuristic
+    from ai.proximity_to_center import ProximityToCenterHeuristic
+
+    settings = EngineSettings(size, size)
+    game = HeadlessGame(settings)
+    ai = engine.MinimaxSimple(game, 'B')
+    samples = sample_positions(size)
+    dict_samples = [(position.to_board_dict(), side) for position, side in samples]
+    first_moves = {id(position): position.generate_moves(side)[0] for position, side in samples}
+
+    def make_unmake(position, side):
+        position.make_move(*first_moves[id(position)])
+        position.unmake_move()
+
+    def check_win(position, side):
+        # After a move, as search asks it, so the groups are updated and not cached
+        position.make_move(*first_moves[id(position)])
+        game.win_checker.check_win('W', position)
+        game.win_checker.check_win('B', position)
+        position.unmake_move()
+
+    heuristics = {
+        'evaluate': ai.evaluate,
+        'better_evaluate': ai.better_evaluate,
+        'EnhancedHeuristic': EnhancedHeuristic(settings).evaluate,
+        'ConnectivityFirstHeuristic': ConnectivityFirstHeuristic(settings).evaluate,
+        'ProximityToCenterHeuristic': ProximityToCenterHeuristic(settings).evaluate,
+    }
+    results = {
+        'generate_moves': _rate(lambda position, side: position.generate_moves(side), samples, min_time),
+        'make_unmake': _rate(make_unmake, samples, min_time),
+        'make_check_win_unmake': _rate(check_win, samples, min_time),
+        'check_win_dict': _rate(lambda board, side: game.win_checker.check_win(side, board), dict_samples, min_time),
+    }
+    for name, evaluate in heuristics.items():
+        results[name] = _rate(evaluate, samples, min_time)
+    return results
+
+
+def run(sizes=SIZES, depth=PERFT_DEPTH, min_time=0.5):
+    """Run perft and the speed benchmarks; returns the results as a JSON-ready dictionary."""
+    results = {'python': platform.python_version(), 'machine': platform.machine(), 'perft': {}, 'speed': {}}
+    for size in sizes:
+        counts = {}
+        for name, (board_dict, side) in benchmark_positions(size).items():
+            position = Position.from_board_dict(board_dict, size, size)
+            counts[name] = [perft(position, side, level) for level in range(1, depth + 1)]
+        results['perft'][str(size)] = counts
+        results['speed'][str(size)] = speed(size, min_time)
+    return results
+
+
+def perft_errors(results):
+    """Return a line for every perft count that differs from PERFT."""
+    errors = []
+    for size, counts in results['perft'].items():
+        for name, found in counts.items():
+            expected = PERFT[int(size)][name][:len(found)]
+            if found[:len(expected)] != expected:
+                errors.append(f"perft {size}x{size} {name}: {found}, expected {expected}")
+    return errors
+
+
+def compare(results, baseline, tolerance):
+    """Return (report lines, slower benchmarks) comparing the speed results with a baseline run."""
+    lines = []
+    slower = []
+    for size, benchmarks in results['speed'].items():
+        for name, rate in benchmarks.items():
+            old = baseline.get('speed', {}).get(size, {}).get(name)
+            if not old:
+                lines.append(f"{size}x{size} {name:28} {rate:12.0f}/s  (not in baseline)")
+                continue
+            ratio = rate / old
+            lines.append(f"{size}x{size} {name:28} {rate:12.0f}/s  {ratio:6.2f}x baseline")
+            if ratio < 1 - tolerance:
+                slower.append(f"{size}x{size} {name}")
+    return lines, slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft counts and speed benchmarks for the engine.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--depth', type=int, default=PERFT_DEPTH, help="Perft depth")
+    parser.add_argument('--time', type=float, default=0.5, help="Seconds each speed benchmark runs for")
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare with the results saved in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.3, help="Slowdown that fails the comparison")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.depth, args.time)
+    if args.save:
+        with open(args.save, 'w') as results_file:
+            json.dump(results, results_file, indent=2)
+
+    for size, counts in results['perft'].items():
+        for name, found in counts.items():
+            print(f"perft {size}x{size} {name:6} {found}")
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            lines, slower = compare(results, json.load(baseline_file), args.tolerance)
+    else:
+        lines = [f"{size}x{size} {name:28} {rate:12.0f}/s"
+                 for size, benchmarks in results['speed'].items() for name, rate in benchmarks.items()]
+        slower = []
+    print('\n'.join(lines))
+
+    errors = perft_errors(results)
+    for error in errors:
+        print(error)
+    if slower:
+        print(f"slower than the baseline: {', '.join(slower)}")
+    sys.exit(1 if errors or slower else 0)
+
+
+if __name__ == '__main__':
+    main()
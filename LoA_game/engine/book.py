@@ -0,0 +1,160 @@
+"""
+Opening books: a move for the common positions of the first plies.
+
+A book is a binary file for one board size: a header, then 16-byte records
+sorted by position key (Position.zobrist_key, which includes the side to
+move). The AIs map the file with mmap and look positions up by binary
+search, so the book is never read into memory and every process on a host
+shares the same pages.
+
+Build one with self-play:
+
+    python -m engine.book --size 8 --games 40 --plies 6 --depth 4
+
+Every position the games reach is searched to --depth and its best move
+stored. Each side plays the book move, or with probability --explore a
+random one, so the book also covers replies other than the best.
+"""
+
+import argparse
+import mmap
+import random
+import struct
+from engine.game import HeadlessGame
+from engine.mapped_file import MappedFiles, replace_file
+from engine.settings import EngineSettings
+from game.position import Position
+
+HEADER = struct.Struct('<4sBBHI')  # Magic, rows, cols, search depth, record count
+RECORD = struct.Struct('<Q4Bf')  # Key, from row, from col, to row, to col, score
+MAGIC = b'LOAB'
+
+class OpeningBook:
+    """A read-only, memory-mapped opening book."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as book_file:
+            self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, self.cols, self.depth, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or len(self.data) != HEADER.size + self.count * RECORD.size:
+            self.data.close()
+            raise ValueError(f"{path} is not an opening book")
+
+    def _key_at(self, index):
+        return struct.unpack_from('<Q', self.data, HEADER.size + index * RECORD.size)[0]
+
+    def probe(self, position, player):
+        """Return the (move, score) stored for position with player to move, or None."""
+        if (position.rows, position.cols) != (self.rows, self.cols):
+            return None
+        key = position.zobrist_key(player)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count or self._key_at(low) != key:
+            return None
+        _, from_row, from_col, to_row, to_col, score = RECORD.unpack_from(self.data, HEADER.size + low * RECORD.size)
+        return ((from_row, from_col), (to_row, to_col)), score
+
+    def close(self):
+        self.data.close()
+
+
+_open_books = MappedFiles(OpeningBook)
+
+
+def open_book(path):
+    """
+    Return the book at path, opened once per process, or None when there is no such file.
+
+    The file is looked at again on every call, so a book built or rebuilt
+    while the program runs is picked up, see engine.mapped_file.
+    """
+    return _open_books.open(path)
+
+
+def book_path(settings):
+    """Return the book file the settings point to for their board size, or None."""
+    if getattr(settings, 'opening_book', None) is None:
+        return None
+    return settings.opening_book.format(rows=settings.rows, cols=settings.cols)
+
+
+def write_book(path, rows, cols, depth, entries):
+    """Write {key: (move, score)} as a book file, replacing the file at path in one step."""
+    def write(book_file):
+        book_file.write(HEADER.pack(MAGIC, rows, cols, depth, len(entries)))
+        for key in sorted(entries):
+            ((from_row, from_col), (to_row, to_col)), score = entries[key]
+            book_file.write(RECORD.pack(key, from_row, from_col, to_row, to_col, score))
+
+    replace_file(path, write)
+
+
+def build_book(size, games, plies, depth, explore=0.3, ai_name='NegamaxBetter', seed=0, progress=None):
+    """
+    Play self-play games from the start position and return {key: (move, score)}.
+
+    Every position reached in the first plies is searched once, to a fixed
+    depth, by the named AI.
+    """
+    import engine
+    ai_class = getattr(engine, ai_name)
+    settings = EngineSettings(size, size)
+    settings.ai_time_budget = None
+    settings.opening_book = None  # Search, don't read the book being built
+    game = HeadlessGame(settings)
+    ais = {}
+    for color in ('B', 'W'):
+        ais[color] = ai_class(game, color)
+        ais[color].search_depth = depth
+
+    rng = random.Random(seed)
+    entries = {}
+    for game_number in range(games):
+        position = Position.from_board_dict(game.board.board_dict, size, size)
+        side = 'B'
+        for ply in range(plies):
+            key = position.zobrist_key(side)
+            if key not in entries:
+                move = ais[side].get_move(position.to_board_dict())
+                if move is None:
+                    break
+                entries[key] = (move, ais[side].root_score)
+            move = entries[key][0]
+            if rng.random() < explore:
+                move = rng.choice(position.generate_moves(side))
+            position.make_move(*move)
+            if position.is_connected('W') or position.is_connected('B'):
+                break
+            side = 'W' if side == 'B' else 'B'
+        if progress:
+            progress(game_number + 1, len(entries))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book with self-play.")
+    parser.add_argument('--size', type=int, default=8)
+    parser.add_argument('--games', type=int, default=40)
+    parser.add_argument('--plies', type=int, default=6)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--explore', type=float, default=0.3, help="Chance of a random move instead of the book move")
+    parser.add_argument('--ai', default='NegamaxBetter', help="The AI class, exported by engine, that searches")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="Book file, by default the one EngineSettings points to")
+    args = parser.parse_args()
+
+    path = args.out or book_path(EngineSettings(args.size, args.size))
+    entries = build_book(args.size, args.games, args.plies, args.depth, args.explore, args.ai, args.seed,
+                         progress=lambda game, count: print(f"game {game}: {count} positions"))
+    write_book(path, args.size, args.size, args.depth, entries)
+    print(f"wrote {len(entries)} positions to {path}")
+
+
+if __name__ == '__main__':
+    main()
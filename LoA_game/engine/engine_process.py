@@ -0,0 +1,199 @@
+"""
+The engine process: AI searches run in a process of their own.
+
+A search on a thread of the game's process shares the interpreter lock
+with the drawing, so frames stutter and the search gets only part of a
+core. EngineProcess starts one process, once, and sends it searches over
+a pipe. The process keeps every AI it builds, one per AI class and
+colour, so transposition tables and MCTS trees carry over from move to
+move as they did in the game's process.
+
+    engine = EngineProcess()
+    future = engine.search(NegamaxBetter, settings, 'B', board_dict)
+    ...
+    if future.done():
+        move, record = future.result()
+
+search returns at once. Its future is resolved by a thread that waits on
+the pipe, so the game only has to look at future.done() every frame.
+record holds the move's telemetry fields, see engine.telemetry.
+
+engine.cancel() stops every search sent so far: the running one stops at
+its next check of its cancel token and queued ones are skipped, so a game
+that is reset or closed doesn't leave a search using a core.
+
+engine.ponder(...) has the AI search ahead on its opponent's time, see
+BaseAI.ponder. A ponder runs until it is done or the next request comes
+down the pipe, so the game just sends the search once the opponent has
+moved.
+"""
+
+import atexit
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future
+from ai.base_ai import BaseAI
+from engine.settings import engine_settings
+
+
+class _CancelToken:
+    """
+    The cancel token of one request: set once that request or a later one
+    is cancelled and, for a ponder, once another request is waiting.
+    """
+
+    def __init__(self, cancelled, request_id, connection=None):
+        self.cancelled = cancelled
+        self.request_id = request_id
+        self.connection = connection
+
+    def is_set(self):
+        if self.cancelled.value >= self.request_id:
+            return True
+        return self.connection is not None and self.connection.poll()
+
+
+def _serve(connection, cancelled):
+    """The engine process: answer search requests until told to stop."""
+    from ai.worker_pool import worker_ai
+    from engine.telemetry import move_record
+
+    while True:
+        request = connection.recv()
+        if request is None:
+            return
+        request_id, pondering, ai_class, settings, color, board_dict = request
+        token = _CancelToken(cancelled, request_id, connection if pondering else None)
+        if token.is_set():
+            connection.send((request_id, None, None))  # Cancelled before it started
+            continue
+        try:
+            ai = worker_ai(ai_class, settings, color, 'engine')
+            ai.cancel_token = token
+            if pondering:
+                reply = (ai.ponder(board_dict), ai.ponder_finished)
+            else:
+                start = time.perf_counter()
+                move = ai.get_move(board_dict)
+                reply = (move, move_record(ai, move, time.perf_counter() - start))
+            connection.send((request_id, reply, None))
+        except Exception as error:
+            connection.send((request_id, None, error))
+
+
+class EngineProcess:
+    """A persistent process that runs AI searches and answers with futures."""
+
+    def __init__(self):
+        # Spawned like the worker pool: the game's process runs threads
+        context = multiprocessing.get_context('spawn')
+        self.connection, child_connection = context.Pipe()
+        self.cancelled = context.Value('q', -1)  # Id of the last cancelled request, see cancel
+        self.process = context.Process(target=_serve, args=(child_connection, self.cancelled), name='loa-engine')
+        self.process.start()
+        child_connection.close()
+        self._ids = itertools.count()
+        self._last_id = -1  # Id of the last request sent
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+        atexit.register(self.close)
+
+    def search(self, ai_class, settings, color, board_dict):
+        """
+        Ask the engine process for color's move on board_dict and return a future of it.
+
+        The future's result is (move, telemetry fields of the move). Requests
+        are answered in the order they are sent.
+        """
+        return self._send(False, ai_class, settings, color, board_dict)
+
+    def ponder(self, ai_class, settings, color, board_dict):
+        """
+        Have color's AI ponder board_dict, its opponent to move, and return a future of it.
+
+        The future's result is (the guessed reply, whether the ponder
+        finished). The next request stops the ponder, see BaseAI.ponder.
+        """
+        return self._send(True, ai_class, settings, color, board_dict)
+
+    def _send(self, pondering, ai_class, settings, color, board_dict):
+        future = Future()
+        with self._lock:
+            request_id = self._last_id = next(self._ids)
+            self._futures[request_id] = future
+            self.connection.send((request_id, pondering, ai_class, engine_settings(settings), color,
+                                  dict(board_dict)))
+        return future
+
+    def _read(self):
+        """Resolve the futures as the answers come in; runs on its own thread."""
+        while True:
+            try:
+                request_id, reply, error = self.connection.recv()
+            except (EOFError, OSError):
+                break  # The process stopped
+            with self._lock:
+                future = self._futures.pop(request_id)
+            if future.cancelled():
+                continue
+            if error is None:
+                future.set_result(reply)
+            else:
+                future.set_exception(error)
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            if not future.cancelled():
+                future.set_exception(RuntimeError("the engine process stopped"))
+
+    def cancel(self):
+        """Stop the running search and skip the queued ones; their futures are cancelled."""
+        with self._lock:
+            self.cancelled.value = self._last_id
+            futures = list(self._futures.values())
+        for future in futures:
+            future.cancel()
+
+    def close(self):
+        """Cancel the searches and stop the engine process."""
+        if self.process.is_alive():
+            self.cancel()
+            with self._lock:
+                self.connection.send(None)
+            self.process.join()
+        self._reader.join()
+        self.connection.close()
+
+
+class RemoteAI(BaseAI):
+    """
+    Stands in for an AI that plays in the engine process.
+
+    The game keeps this object as the player: it has the AI's colour and
+    class, while the searches, tables and trees live in the engine process.
+    """
+
+    def __init__(self, engine, ai_class, game, color):
+        # Not BaseAI.__init__: the search state, the tablebase mapping
+        # included, belongs in the engine process, this object never searches
+        self.game = game
+        self.color = color
+        self.search_depth = None
+        self.engine = engine
+        self.ai_class = ai_class
+
+    def request_move(self, board_state):
+        """Start a search for board_state and return its future, see EngineProcess.search."""
+        return self.engine.search(self.ai_class, self.game.settings, self.color, board_state)
+
+    def request_ponder(self, board_state):
+        """Start pondering board_state, the opponent to move, and return its future, see EngineProcess.ponder."""
+        return self.engine.ponder(self.ai_class, self.game.settings, self.color, board_state)
+
+    def get_move(self, board_state):
+        move, _ = self.request_move(board_state).result()
+        return move
@@ -0,0 +1,95 @@
+from engine.settings import EngineSettings
+from game.movement import LOAMovement
+from game.win_check import WinChecker
+
+
+def initial_board(rows, cols):
+    """Return the starting position as a {(row, col): 'W' | 'B'} dictionary."""
+    board_dict = {}
+    # White pieces on the first and last columns.
+    for col in (0, cols - 1):
+        for row in range(1, rows - 1):
+            board_dict[(row, col)] = 'W'
+    # Black pieces on the first and last rows.
+    for row in (0, rows - 1):
+        for col in range(1, cols - 1):
+            board_dict[(row, col)] = 'B'
+    return board_dict
+
+
+class HeadlessBoard:
+    """The board state without any drawing."""
+
+    def __init__(self, game):
+        """
+        Initialize the board.
+
+        Args:
+            game: The game the board belongs to, read for its settings.
+        """
+        self.settings = game.settings
+
+        # Initialize a dictionary to store the piece locations
+        self.board_dict = {}
+        self._create_pieces()
+
+    def _create_pieces(self):
+        """Create the initial set of pieces."""
+        self.board_dict.update(initial_board(self.settings.rows, self.settings.cols))
+
+    def reset_board(self):
+        """Reset the board to the initial state."""
+        self.board_dict.clear()
+        self._create_pieces()
+
+    def move_piece(self, from_pos, to_pos):
+        """
+        Move the piece on from_pos to to_pos, capturing whatever stands there.
+
+        Returns the captured piece ('W' | 'B') or None.
+        """
+        captured = self.board_dict.get(to_pos)
+        self.board_dict[to_pos] = self.board_dict.pop(from_pos)
+        return captured
+
+
+class HeadlessGame:
+    """
+    A game of Lines of Action without a display.
+
+    Holds what the AIs read from a game: settings, board, movement and
+    win_checker. Batch jobs, benchmarks and worker processes play on it
+    directly, and the pygame LinesOfAction builds on it.
+    """
+
+    def __init__(self, settings=None, board_dict=None):
+        """
+        Initialize the game.
+
+        Args:
+            settings: Engine settings, by default an 8x8 board.
+            board_dict: Position to start from instead of the initial one.
+        """
+        self.settings = settings or EngineSettings()
+        self.board = self._create_board()
+        if board_dict is not None:
+            self.board.board_dict.clear()
+            self.board.board_dict.update(board_dict)
+        self.movement = LOAMovement(self)
+        self.win_checker = WinChecker(self)
+
+    def _create_board(self):
+        """Return the board to play on; the UI replaces it with a drawable one."""
+        return HeadlessBoard(self)
+
+    def play(self, from_pos, to_pos):
+        """Play a move on the board. Returns the captured piece or None."""
+        return self.board.move_piece(from_pos, to_pos)
+
+    def winner(self):
+        """Return the side whose pieces are all connected ('W' | 'B'), or None."""
+        if self.win_checker.check_win('W'):
+            return 'W'
+        if self.win_checker.check_win('B'):
+            return 'B'
+        return None
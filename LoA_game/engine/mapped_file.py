@@ -0,0 +1,64 @@
+"""
+Files the engine maps into memory read-only: opening books and tablebases.
+
+Other processes may have a file mapped while it is rebuilt, and truncating
+a mapped file makes their reads fail. replace_file writes a new file next
+to the old one and moves it over the old one's name with os.replace: a
+process that has the old file mapped keeps its complete copy, and no
+process ever opens a half-written file.
+
+MappedFiles keeps a process's open files, one per path, and looks at the
+file on disk on every call: a file that was replaced since it was opened,
+seen by its modification time and inode, is opened again and the old
+mapping closed.
+"""
+
+import os
+import struct
+import tempfile
+
+
+def replace_file(path, write):
+    """Call write(file) on a new file next to path, then move it over path."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=directory or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as out:
+            write(out)
+        os.chmod(temporary, 0o644)  # mkstemp makes the file private to its owner
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class MappedFiles:
+    """The files of one kind a process has open, opened again when they change on disk."""
+
+    def __init__(self, opener):
+        """opener(path) opens a file, raising ValueError or struct.error when it isn't one of its kind."""
+        self.opener = opener
+        self.files = {}  # {path: ((modification time, inode) or None, open file or None)}
+
+    def open(self, path):
+        """Return the open file at path, or None when there is no such file or it can't be read."""
+        try:
+            stat = os.stat(path)
+            stamp = (stat.st_mtime_ns, stat.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        cached = self.files.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        if cached is not None and cached[1] is not None:
+            cached[1].close()
+        opened = None
+        if stamp is not None:
+            try:
+                opened = self.opener(path)
+            except (OSError, ValueError, struct.error) as error:
+                print(f"Not using {path}: {error}")
+        self.files[path] = (stamp, opened)
+        return opened
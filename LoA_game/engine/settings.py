@@ -0,0 +1,47 @@
+class EngineSettings:
+    """The settings the engine needs: board size, movement and AI limits. Needs no display."""
+
+    def __init__(self, rows=8, cols=8):
+        """Initialize the engine's settings."""
+
+        # Board settings
+        self.rows = rows
+        self.cols = cols
+
+        # Movement Settings
+        self.directions = [
+            (1, 0), (-1, 0),  # Horizontal (Right, Left)
+            (0, 1), (0, -1),  # Vertical (Down, Up)
+            (1, 1), (-1, -1), # Diagonal (Bottom-right, Top-left)
+            (1, -1), (-1, 1)  # Diagonal (Bottom-left, Top-right)
+        ]
+
+        # AI settings
+        self.tt_size_mb = 16  # Memory cap of each AI's transposition table
+        self.ai_time_budget = 2.0  # Seconds per move, None for a fixed depth or iteration count
+        self.ai_hard_limit = None  # Seconds after which a search stops with the best move so far, None for no limit
+        self.ai_max_depth = 8  # Deepest iteration iterative deepening will start
+        self.mcts_iterations = 10000  # MCTS iterations per move, a cap when there is a time budget
+        self.mcts_playout_depth = 6  # Random moves per playout before the heuristic, None to play out
+        self.mcts_max_nodes = 100000  # Tree size cap, least visited subtrees are recycled beyond it
+        self.ai_workers = 1  # Processes a search is spread over, 1 searches in the calling process
+        self.opening_book = 'books/book_{rows}x{cols}.bin'  # Built by engine/book.py, None to always search
+        self.solver_max_pieces = 10  # Positions with at most this many pieces go to the proof-number solver first
+        self.solver_nodes = 20000  # Node budget of one proof-number search, 0 turns the solver off
+        self.solver_second_level = 100  # Nodes of the PN² search at each expanded leaf, 0 for plain PN
+        self.solver_table_mb = 4  # Memory cap of the solver's table of solved positions
+        self.tablebase = 'books/tablebase_{rows}x{cols}.bin'  # Built by engine/tablebase.py, None to never probe
+
+
+def engine_settings(settings):
+    """
+    Return a plain EngineSettings holding the engine values of settings.
+
+    The copy has no display attributes, so it can be sent to a worker
+    process that never imports pygame. Values settings lacks keep their
+    defaults.
+    """
+    copy = EngineSettings(settings.rows, settings.cols)
+    for name, value in vars(copy).items():
+        setattr(copy, name, getattr(settings, name, value))
+    return copy
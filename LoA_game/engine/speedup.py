@@ -0,0 +1,88 @@
+"""
+Compare a parallel search with the serial one.
+
+    python -m engine.speedup --ai NegamaxBetter --workers 4 --size 8 --depth 3
+
+Searches the same positions, each a few random moves from the start, once
+in the calling process and once split over the worker pool, both to a
+fixed depth. Prints the nodes and time of each, the nodes of every worker
+and the speedup.
+"""
+
+import argparse
+import random
+import time
+from engine.game import HeadlessGame
+from engine.settings import EngineSettings
+from game.position import Position
+
+
+def sample_positions(size, count, seed=0):
+    """
+    Return count (board_dict, side to move) pairs a few random moves into a game.
+
+    A walk that ends the game, or reaches a side without a move, is
+    dropped and another one is tried.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = HeadlessGame(EngineSettings(size, size))
+        position = Position.from_board_dict(game.board.board_dict, size, size)
+        side = 'B'
+        for _ in range(rng.randint(2, 10)):
+            moves = position.generate_moves(side)
+            if not moves:
+                break
+            position.make_move(*rng.choice(moves))
+            side = 'W' if side == 'B' else 'B'
+            if position.is_connected('W') or position.is_connected('B'):
+                break
+        else:
+            if position.generate_moves(side):
+                positions.append((position.to_board_dict(), side))
+    return positions
+
+
+def run(ai_class, board_dict, side, size, depth, workers):
+    """Search one position; returns (seconds, nodes, nodes of each worker, move)."""
+    settings = EngineSettings(size, size)
+    settings.ai_time_budget = None
+    settings.ai_workers = workers
+    ai = ai_class(HeadlessGame(settings, board_dict), side)
+    ai.search_depth = depth
+    start = time.perf_counter()
+    move = ai.get_move(board_dict)
+    return time.perf_counter() - start, ai.nodes_explored, ai.worker_nodes, move
+
+
+def main():
+    import engine
+    from ai.worker_pool import get_pool, shutdown_pool
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ai', default='NegamaxBetter', help="An AI class exported by engine")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--size', type=int, default=8)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--positions', type=int, default=4)
+    args = parser.parse_args()
+
+    ai_class = getattr(engine, args.ai)
+    get_pool(args.workers)  # Start the processes before the clock runs
+    serial_time = parallel_time = 0.0
+    try:
+        for board_dict, side in sample_positions(args.size, args.positions):
+            s_time, s_nodes, _, _ = run(ai_class, board_dict, side, args.size, args.depth, 1)
+            p_time, p_nodes, worker_nodes, _ = run(ai_class, board_dict, side, args.size, args.depth, args.workers)
+            serial_time += s_time
+            parallel_time += p_time
+            print(f"serial {s_nodes} nodes {s_time:.2f}s | parallel {p_nodes} nodes {p_time:.2f}s "
+                  f"workers {worker_nodes} | speedup {s_time / p_time:.2f}")
+    finally:
+        shutdown_pool()
+    print(f"total speedup with {args.workers} workers: {serial_time / parallel_time:.2f}")
+
+
+if __name__ == '__main__':
+    main()
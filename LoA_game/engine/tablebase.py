@@ -0,0 +1,315 @@
+"""
+Endgame tablebases: the exact result of every position with few pieces.
+
+A tablebase covers one board size and every material with one to
+max_pieces pieces a side. For each position and side to move it holds a
+byte: 0 for a draw, neither side can force a connection, 1 + d for a win
+in d plies and 129 + d for a loss in d plies, for the side to move.
+
+The file is a header and one section per material, ordered by piece
+count. Within a section a position's place is its combinatorial index:
+the rank of the set of white squares among all sets of that size, then
+the rank of the black squares among the squares white leaves free, then
+the side to move. Search maps the file with mmap and probes it with
+Tablebase.probe, so the tables are never read into memory.
+
+Build one with:
+
+    python -m engine.tablebase --size 6 --pieces 2
+
+The tables are built by retrograde analysis, smallest material first. The
+moves of every position are generated once; a capture leads into a
+smaller material whose results are already known, other moves are kept
+as edges to their position. Results then spread backwards along the
+edges in order of distance: a position with a lost successor is won, one
+whose successors are all won is lost. Positions the analysis never
+reaches are draws.
+
+The cost grows fast with the board and the piece count: two pieces a side
+on 6x6 is about 700 thousand positions, three is 78 million.
+"""
+
+import argparse
+import mmap
+import struct
+from array import array
+from itertools import combinations
+from math import comb
+from ai.proof_number import LOSS, WIN
+from engine.mapped_file import MappedFiles, replace_file
+from engine.settings import EngineSettings
+from game.connectivity import flood
+from game.position import WHITE, get_geometry, iter_bits
+
+HEADER = struct.Struct('<4sBBB')  # Magic, rows, cols, most pieces a side
+MAGIC = b'LOAT'
+DRAW = 0
+MAX_DISTANCE = 126  # Longest win or loss a byte can hold
+
+
+def _encode(result, distance):
+    if distance > MAX_DISTANCE:
+        raise ValueError(f"a result {distance} plies deep does not fit in the tablebase")
+    return 1 + distance if result == WIN else 129 + distance
+
+
+def _decode(value):
+    """Return (result, distance) for a stored byte."""
+    if value == 0:
+        return DRAW, 0
+    if value <= 128:
+        return WIN, value - 1
+    return LOSS, value - 129
+
+
+def _sections(cells, max_pieces):
+    """Return {(white count, black count): (offset, positions)}, smallest material first."""
+    materials = sorted(((w, b) for w in range(1, max_pieces + 1) for b in range(1, max_pieces + 1)),
+                       key=lambda material: (sum(material), material))
+    sections = {}
+    offset = HEADER.size
+    for white, black in materials:
+        positions = comb(cells, white) * comb(cells - white, black) * 2
+        sections[(white, black)] = (offset, positions)
+        offset += positions
+    return sections
+
+
+def _rank(cells):
+    """Return the rank of a sorted set of cells among all sets of its size."""
+    return sum(comb(cell, i + 1) for i, cell in enumerate(cells))
+
+
+def _index(white_cells, black_cells, white_to_move, cells):
+    """Return the place of a position within its material's section."""
+    # Black cells are numbered among the cells white leaves free
+    free = [cell - sum(1 for white in white_cells if white < cell) for cell in black_cells]
+    black_ranks = comb(cells - len(white_cells), len(black_cells))
+    return (_rank(white_cells) * black_ranks + _rank(free)) * 2 + white_to_move
+
+
+class _Board:
+    """Cell numbering and mask helpers for one board size."""
+
+    def __init__(self, rows, cols):
+        self.geometry = get_geometry(rows, cols)
+        self.squares = self.geometry.squares  # Square of each cell
+        self.cell_of = {sq: cell for cell, sq in enumerate(self.squares)}
+
+    def cells(self, mask):
+        return [self.cell_of[sq] for sq in iter_bits(mask)]
+
+    def index(self, white, black, white_to_move):
+        return _index(self.cells(white), self.cells(black), white_to_move, len(self.squares))
+
+    def connected(self, mask):
+        return mask != 0 and flood(mask & -mask, mask, self.geometry) == mask
+
+    def moves(self, own, enemy):
+        """Yield the (from, to) squares of every move of the side owning own, as Position does."""
+        geometry = self.geometry
+        occupied = own | enemy
+        for sq in iter_bits(own):
+            counts = [(geometry.line_masks[line_id] & occupied).bit_count() for line_id in geometry.line_ids[sq]]
+            for i, ray in enumerate(geometry.rays[sq]):
+                distance = counts[i >> 1]
+                if distance < len(ray):
+                    target, between = ray[distance]
+                    if not (between & enemy) and not (own >> target & 1):
+                        yield sq, target
+
+
+class Tablebase:
+    """A read-only, memory-mapped tablebase."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as table_file:
+            self.data = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, self.cols, self.max_pieces = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.data.close()
+            raise ValueError(f"{path} is not a tablebase")
+        self.board = _Board(self.rows, self.cols)
+        self.sections = _sections(self.rows * self.cols, self.max_pieces)
+        offset, positions = self.sections[(self.max_pieces, self.max_pieces)]
+        if len(self.data) != offset + positions:
+            self.data.close()
+            raise ValueError(f"{path} is not a tablebase")
+
+    def covers(self, position):
+        """Return True when the position's board size and material are in the tablebase."""
+        return ((position.rows, position.cols) == (self.rows, self.cols)
+                and 0 < position.white.bit_count() <= self.max_pieces
+                and 0 < position.black.bit_count() <= self.max_pieces)
+
+    def probe(self, position, player):
+        """Return (result, distance) for position with player to move, or None when it isn't covered."""
+        if not self.covers(position):
+            return None
+        offset, _ = self.sections[(position.white.bit_count(), position.black.bit_count())]
+        return _decode(self.data[offset + self.board.index(position.white, position.black, player == WHITE)])
+
+    def close(self):
+        self.data.close()
+
+
+def open_tablebase(path):
+    """
+    Return the tablebase at path, opened once per process, or None when there is no such file.
+
+    The file is looked at again on every call, so a tablebase built or
+    rebuilt while the program runs is picked up, see engine.mapped_file.
+    """
+    return _open_tablebases.open(path)
+
+
+_open_tablebases = MappedFiles(Tablebase)
+
+
+def tablebase_path(settings):
+    """Return the tablebase file the settings point to for their board size, or None."""
+    if getattr(settings, 'tablebase', None) is None:
+        return None
+    return settings.tablebase.format(rows=settings.rows, cols=settings.cols)
+
+
+def _solve_material(board, white_count, black_count, solved):
+    """Return the results of one material as a bytearray; solved holds the smaller materials."""
+    cells = len(board.squares)
+    squares = board.squares
+    size = comb(cells, white_count) * comb(cells - white_count, black_count) * 2
+    values = bytearray(size)
+    unresolved = bytearray(size)  # Successors that are not known to be won
+    win_at = bytearray(b'\xff') * size  # Shortest win found so far, 255 for none
+    loss_at = bytearray(size)  # Longest of the won successors
+    buckets = [[]]  # Positions to settle, by distance
+    edge_from = array('I')  # Moves within this material, as (successor, position) pairs
+    edge_to = array('I')
+
+    def push(index, distance):
+        while len(buckets) <= distance:
+            buckets.append([])
+        buckets[distance].append(index)
+
+    # Every position once: game over, or its moves
+    for white_cells in combinations(range(cells), white_count):
+        white = 0
+        for cell in white_cells:
+            white |= 1 << squares[cell]
+        free = [cell for cell in range(cells) if cell not in white_cells]
+        for black_free in combinations(range(cells - white_count), black_count):
+            black = 0
+            for cell in black_free:
+                black |= 1 << squares[free[cell]]
+            base = (_rank(white_cells) * comb(cells - white_count, black_count) + _rank(black_free)) * 2
+            # White is checked first, as the game does when both sides are connected
+            winner = 'W' if board.connected(white) else 'B' if board.connected(black) else None
+            for white_to_move in (0, 1):
+                index = base + white_to_move
+                if winner is not None:
+                    if (winner == WHITE) == bool(white_to_move):
+                        win_at[index] = 0
+                    push(index, 0)
+                    continue
+                own, enemy = (white, black) if white_to_move else (black, white)
+                count = 0
+                for from_sq, to_sq in board.moves(own, enemy):
+                    moved = own ^ (1 << from_sq) ^ (1 << to_sq)
+                    left = enemy & ~(1 << to_sq)
+                    child_white, child_black = (moved, left) if white_to_move else (left, moved)
+                    child = board.index(child_white, child_black, not white_to_move)
+                    if left == enemy:
+                        count += 1
+                        edge_from.append(child)
+                        edge_to.append(index)
+                        continue
+                    # A capture, into a smaller material that is already solved
+                    result, distance = _decode(solved[(child_white.bit_count(), child_black.bit_count())][child])
+                    if result == LOSS:
+                        win_at[index] = min(win_at[index], distance + 1)
+                    elif result == WIN:
+                        loss_at[index] = max(loss_at[index], distance + 1)
+                    else:
+                        count += 1  # A draw, this position is never lost
+                unresolved[index] = count
+                if win_at[index] != 255:
+                    push(index, win_at[index])
+                elif count == 0:
+                    push(index, loss_at[index])
+
+    # The positions each position is reached from, grouped by successor
+    starts = array('I', bytes(4 * (size + 1)))
+    for child in edge_from:
+        starts[child + 1] += 1
+    for index in range(size):
+        starts[index + 1] += starts[index]
+    parents = array('I', bytes(4 * len(edge_from)))
+    cursor = array('I', starts)
+    for child, parent in zip(edge_from, edge_to):
+        parents[cursor[child]] = parent
+        cursor[child] += 1
+    del edge_from, edge_to, cursor
+
+    # Settle positions in order of distance and pass each result back to its parents
+    distance = 0
+    while distance < len(buckets):
+        for index in buckets[distance]:
+            if values[index]:
+                continue
+            won = win_at[index] == distance
+            values[index] = _encode(WIN if won else LOSS, distance)
+            for parent in parents[starts[index]:starts[index + 1]]:
+                if values[parent]:
+                    continue
+                if not won:
+                    if win_at[parent] > distance + 1:
+                        win_at[parent] = distance + 1
+                        push(parent, distance + 1)
+                    continue
+                unresolved[parent] -= 1
+                loss_at[parent] = max(loss_at[parent], distance + 1)
+                if unresolved[parent] == 0 and win_at[parent] == 255:
+                    push(parent, loss_at[parent])
+        buckets[distance] = None
+        distance += 1
+    return values
+
+
+def build_tablebase(rows, cols, max_pieces, progress=None):
+    """Return {(white count, black count): results} for every material up to max_pieces a side."""
+    board = _Board(rows, cols)
+    solved = {}
+    for material in _sections(rows * cols, max_pieces):
+        solved[material] = _solve_material(board, material[0], material[1], solved)
+        if progress:
+            progress(material, len(solved[material]))
+    return solved
+
+
+def write_tablebase(path, rows, cols, max_pieces, solved):
+    """Write the results build_tablebase returned as a tablebase file, replacing the file at path in one step."""
+    def write(table_file):
+        table_file.write(HEADER.pack(MAGIC, rows, cols, max_pieces))
+        for material in _sections(rows * cols, max_pieces):
+            table_file.write(solved[material])
+
+    replace_file(path, write)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an endgame tablebase by retrograde analysis.")
+    parser.add_argument('--size', type=int, default=6)
+    parser.add_argument('--pieces', type=int, default=2, help="Most pieces a side")
+    parser.add_argument('--out', help="Tablebase file, by default the one EngineSettings points to")
+    args = parser.parse_args()
+
+    path = args.out or tablebase_path(EngineSettings(args.size, args.size))
+    solved = build_tablebase(args.size, args.size, args.pieces,
+                             progress=lambda material, count: print(f"{material[0]} white, {material[1]} black: "
+                                                                    f"{count} positions"))
+    write_tablebase(path, args.size, args.size, args.pieces, solved)
+    print(f"wrote {path}")
+
+
+if __name__ == '__main__':
+    main()
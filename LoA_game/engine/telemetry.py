@@ -0,0 +1,117 @@
+"""
+Structured telemetry: one record per event, as a JSON-ready dictionary.
+
+A Telemetry object hands every record it is given to its subscribers,
+plain callables, in the thread that emits it. JsonLinesSink is such a
+subscriber: it queues the record and a background thread appends it to a
+JSON-lines file, so the thread that plays the moves never waits on the
+disk.
+
+    telemetry = Telemetry()
+    telemetry.subscribe(JsonLinesSink('telemetry.jsonl'))
+    telemetry.subscribe(lambda record: print(record['nps']))
+
+The records the game writes:
+
+    {"event": "game_start", "game": id, "white": choice, "black": choice, "rows": 8, "cols": 8, ...}
+    {"event": "move", "game": id, "ply": 3, "ai": "NegamaxBetter", "color": "B", "move": [[0, 1], [2, 3]],
+     "seconds": 1.2, "nps": 9500.0, "nodes": 11400, "depth": 4, "source": "search", "cutoffs": 830,
+     "tt_hits": 2100, ...}
+    {"event": "error", "game": id, "ply": 3, "ai": "NegamaxBetter", "color": "B", "error": "RuntimeError(...)", ...}
+    {"event": "game_end", "game": id, "winner": "W", "plies": 41, ...}
+
+Every record also has "time", the Unix time it was made. The statistics
+of a move are the AI's search_stats(): alpha-beta AIs add cutoffs and
+tt_hits, MCTS adds mcts_iterations, tree_size and reused_visits.
+"""
+
+import atexit
+import json
+import queue
+import threading
+import time
+import traceback
+
+_CLOSE = object()  # Tells the writer thread to stop
+
+
+class Telemetry:
+    """Hands records to the subscribed callbacks."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def subscribe(self, callback):
+        """Call callback(record) for every record from now on; returns callback."""
+        self.callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.callbacks.remove(callback)
+
+    def emit(self, event, **fields):
+        """Build a record of the event and the fields and pass it to every subscriber."""
+        record = {'event': event, 'time': time.time()}
+        record.update(fields)
+        for callback in list(self.callbacks):
+            try:
+                callback(record)
+            except Exception:
+                # A broken subscriber must not stop the game, or the AI thread emitting
+                traceback.print_exc()
+        return record
+
+
+def move_record(ai, move, seconds):
+    """Return the fields of a move record: the move, its time and the AI's search statistics."""
+    stats = ai.search_stats()
+    fields = {
+        'ai': type(ai).__name__,
+        'color': ai.color,
+        'move': move,
+        'seconds': seconds,
+        'nps': stats['nodes'] / seconds if seconds > 0 else None,
+    }
+    fields.update(stats)
+    return fields
+
+
+class JsonLinesSink:
+    """
+    A subscriber that appends records to a file, one JSON object a line.
+
+    Records are written by a background thread. It writes whatever has
+    piled up in the queue before it flushes, so the file sees few, large
+    writes when records come quickly and every record soon when they
+    don't. The sink closes itself at exit, writing out what is left.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def __call__(self, record):
+        self.queue.put(record)
+
+    def _write(self):
+        with open(self.path, 'a') as out:
+            while True:
+                record = self.queue.get()
+                while record is not _CLOSE:
+                    out.write(json.dumps(record) + '\n')
+                    try:
+                        record = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                out.flush()
+                if record is _CLOSE:
+                    return
+
+    def close(self):
+        """Write the queued records and stop the writer thread."""
+        if self.thread.is_alive():
+            self.queue.put(_CLOSE)
+            self.thread.join()
@@ -1,8 +1,9 @@
 import pygame
+from engine.game import HeadlessBoard
 from game.pieces import Piece
 
-class Board:
-    """A class to manage the game board."""
+class Board(HeadlessBoard):
+    """A class to manage the game board and draw it."""
 
     def __init__(self, game):
         """
@@ -12,41 +13,55 @@ class Board:
             game: The instance of the main game class (LinesOfAction).
         """
         self.screen = game.screen
-        self.settings = game.settings
-
-        # Initialize a dictionary to store the piece locations
-        self.board_dict = {}
 
         # Initialize a sprite group for pieces.
         self.pieces = pygame.sprite.Group()
 
         # Create the initial set of pieces.
-        self._create_pieces()
+        super().__init__(game)
         
         # Store the valid moves for the selected piece.
         self.valid_moves = []
 
+        # The checkerboard and the last move's shade, drawn once per board size
+        self.background = None
+        self.last_move_overlay = None
+        self._surface_size = None
+
     def _create_pieces(self):
-        """Create the initial set of pieces."""
-        # Create white pieces.
-        for col in (0, self.settings.cols - 1):
-            for row in range(1, self.settings.rows - 1):
-                pos = (col * self.settings.square_size, row * self.settings.square_size)
-                piece = Piece(self.settings, 'white', pos)
-                self.pieces.add(piece)
-                self.board_dict[(row, col)] = 'W'  # 'W' represents a white piece in the matrix
-
-        # Create black pieces.
-        for row in (0, self.settings.rows - 1):
-            for col in range(1, self.settings.cols - 1):
-                pos = (col * self.settings.square_size, row * self.settings.square_size)
-                piece = Piece(self.settings, 'black', pos)
-                self.pieces.add(piece)
-                self.board_dict[(row, col)] = 'B'  # 'B' represents a black piece in the matrix
+        """Create the initial set of pieces and their sprites."""
+        super()._create_pieces()
+        for (row, col), color in self.board_dict.items():
+            pos = (col * self.settings.square_size, row * self.settings.square_size)
+            piece = Piece(self.settings, 'white' if color == 'W' else 'black', pos)
+            self.pieces.add(piece)
         print(self.board_dict)
 
-    def draw_board(self, last_move_to = None):
-        """Draw the game board with alternating colors."""
+    def _sprite_at(self, row, col):
+        """Return the sprite of the piece on (row, col), or None."""
+        topleft = (col * self.settings.square_size, row * self.settings.square_size)
+        for piece in self.pieces:
+            if piece.rect.topleft == topleft:
+                return piece
+        return None
+
+    def move_piece(self, from_pos, to_pos):
+        """Move a piece and its sprite, removing the sprite of a captured piece."""
+        captured = super().move_piece(from_pos, to_pos)
+        if captured:
+            self.pieces.remove(self._sprite_at(*to_pos))
+        piece = self._sprite_at(*from_pos)
+        if piece:
+            piece.rect.topleft = (to_pos[1] * self.settings.square_size, to_pos[0] * self.settings.square_size)
+        return captured
+
+    def _build_surfaces(self):
+        """Draw the checkerboard and the last move's shade, when the board size has changed."""
+        size = (self.settings.rows, self.settings.cols, self.settings.square_size)
+        if self._surface_size == size:
+            return
+        square = self.settings.square_size
+        self.background = pygame.Surface((self.settings.cols * square, self.settings.rows * square)).convert()
         for row in range(self.settings.rows):
             for col in range(self.settings.cols):
                 color = (
@@ -54,24 +69,55 @@ class Board:
                     if (row + col) % 2 == 0 
                     else self.settings.dark_color
                 )
-                pygame.draw.rect(
-                    self.screen, color,
-                    (col * self.settings.square_size, row * self.settings.square_size, 
-                     self.settings.square_size, self.settings.square_size)
-                )
+                self.background.fill(color, self.square_rect(row, col))
+        self.last_move_overlay = pygame.Surface((square, square), pygame.SRCALPHA)
+        self.last_move_overlay.fill((0, 0, 0, 50))
+        self._surface_size = size
+
+    def square_rect(self, row, col):
+        """Return the rectangle of the square on (row, col)."""
+        square = self.settings.square_size
+        return pygame.Rect(col * square, row * square, square, square)
+
+    def squares_under(self, rect):
+        """Return the squares rect overlaps."""
+        square = self.settings.square_size
+        rows = range(max(rect.top // square, 0), min((rect.bottom - 1) // square + 1, self.settings.rows))
+        cols = range(max(rect.left // square, 0), min((rect.right - 1) // square + 1, self.settings.cols))
+        return {(row, col) for row in rows for col in cols}
+
+    def draw_board(self, last_move_to = None):
+        """Draw the game board with alternating colors."""
+        self._build_surfaces()
+        self.screen.blit(self.background, (0, 0))
         if last_move_to:
-            row, col = last_move_to
-            overlay = pygame.Surface((self.settings.square_size, self.settings.square_size), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 50))
-            self.screen.blit(overlay, (col * self.settings.square_size, row * self.settings.square_size))
+            self.screen.blit(self.last_move_overlay, self.square_rect(*last_move_to))
 
+    def draw_squares(self, squares, last_move_to=None, valid_moves=(), pieces=True):
+        """
+        Redraw only the given squares: the board, the last move's shade, the
+        pieces and the valid move dots on them. Returns their rectangles, for
+        pygame.display.update.
+        """
+        self._build_surfaces()
+        rects = {}
+        for row, col in squares:
+            rect = self.square_rect(row, col)
+            self.screen.blit(self.background, rect, rect)
+            if (row, col) == last_move_to:
+                self.screen.blit(self.last_move_overlay, rect)
+            rects[rect.topleft] = rect
+        if pieces:
+            for piece in self.pieces:
+                if piece.rect.topleft in rects:
+                    self.screen.blit(piece.image, piece.rect)
+        self.draw_valid_moves([move for move in valid_moves if move in squares])
+        return list(rects.values())
 
     def reset_board(self):
         """Reset the board to the initial state."""
-        # Clear the existing pieces and board dictionary
         self.pieces.empty()  # Remove all pieces from the sprite group
-        self.board_dict.clear()  # Clear the dictionary holding piece locations
-        self._create_pieces()
+        super().reset_board()
 
     def draw_pieces(self):
         """Draw all the pieces on the board."""
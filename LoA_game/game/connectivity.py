@@ -0,0 +1,137 @@
+"""
+Incremental tracking of connected groups.
+
+A side's groups are kept as a tuple of disjoint bit masks, one per group of
+8-connected pieces. The tuples are never changed in place, so Position can
+put the old tuples on its undo stack and restore them on unmake_move.
+
+Quad counts give a cheaper, one-sided test. Every 2x2 window of the board,
+including the windows hanging over its edge, is a quad, classed by the
+pieces of one side inside it: Q1 with one piece, Q3 with three, QD with two
+on a diagonal. The Euler number of the pieces (groups minus holes, for
+8-connected pieces) is (Q1 - Q3 - 2 * QD) / 4, so a side whose Euler
+number is above one has at least two groups.
+"""
+
+
+def flood(seed, mask, geometry):
+    """Return the pieces of mask connected to the pieces of seed."""
+    stride = geometry.stride
+    board_mask = geometry.board_mask
+    group = seed
+    while True:
+        grown = group | (group << 1) | (group >> 1)
+        grown = (grown | (grown << stride) | (grown >> stride)) & mask & board_mask
+        if grown == group:
+            return group
+        group = grown
+
+
+def find_groups(mask, geometry):
+    """Split mask into its connected groups with full flood fills."""
+    groups = []
+    while mask:
+        group = flood(mask & -mask, mask, geometry)
+        groups.append(group)
+        mask ^= group
+    return tuple(groups)
+
+
+def _stays_whole(rest, sq, geometry):
+    """
+    Return True if rest, a group that just lost the piece on sq, is still one group.
+
+    The test is local: the group holds together when the pieces around sq are
+    connected to each other inside the eight squares around it.
+    """
+    ring = geometry.neighbours[sq] & rest
+    if not ring & (ring - 1):
+        return True  # A single neighbour
+    return flood(ring & -ring, ring, geometry) == ring
+
+
+def remove_piece(groups, sq, geometry):
+    """
+    Return groups with the piece on sq taken away.
+
+    Only the group that held the piece can change. When it does not stay
+    whole, the remaining pieces of that group alone are split again.
+    """
+    bit = 1 << sq
+    for i, group in enumerate(groups):
+        if group & bit:
+            break
+    rest = group ^ bit
+    others = groups[:i] + groups[i + 1:]
+    if not rest:
+        return others
+    if _stays_whole(rest, sq, geometry):
+        return others + (rest,)
+    return others + find_groups(rest, geometry)
+
+
+def add_piece(groups, sq, geometry):
+    """Return groups with a piece placed on sq, merged with every group it touches."""
+    around = geometry.neighbours[sq]
+    merged = 1 << sq
+    touching = [group for group in groups if group & around]
+    if not touching:
+        return groups + (merged,)
+    for group in touching:
+        merged |= group
+    return tuple([group for group in groups if not group & around]) + (merged,)
+
+
+def move_piece(groups, from_sq, to_sq, geometry):
+    """Return groups after a piece moves from from_sq to to_sq."""
+    from_bit = 1 << from_sq
+    if len(groups) == 1:
+        # Fast exit: a connected side stays connected when the piece lands
+        # next to the rest of its group and the rest holds together
+        rest = groups[0] ^ from_bit
+        if geometry.neighbours[to_sq] & rest and _stays_whole(rest, from_sq, geometry):
+            return (rest | (1 << to_sq),)
+    return add_piece(remove_piece(groups, from_sq, geometry), to_sq, geometry)
+
+
+def quad_weights(window):
+    """
+    Return {pieces: weight} for every way of filling the squares of window.
+
+    The weight is the quad's share of four times the Euler number: 1 for Q1,
+    -1 for Q3, -2 for QD and 0 otherwise.
+    """
+    squares = [1 << sq for sq in window]
+    diagonals = set()
+    if len(window) == 4:  # Ordered top left, top right, bottom left, bottom right
+        diagonals = {squares[0] | squares[3], squares[1] | squares[2]}
+    weights = {}
+    for pattern in range(1 << len(squares)):
+        pieces = 0
+        for i, bit in enumerate(squares):
+            if pattern >> i & 1:
+                pieces |= bit
+        count = pieces.bit_count()
+        if count == 1:
+            weights[pieces] = 1
+        elif count == 3:
+            weights[pieces] = -1
+        elif pieces in diagonals:
+            weights[pieces] = -2
+        else:
+            weights[pieces] = 0
+    return weights
+
+
+def euler_quads(mask, geometry):
+    """Return four times the Euler number of mask, counted over every quad."""
+    return sum(weights[mask & window] for window, weights in geometry.quad_windows)
+
+
+def euler_delta(mask, sq, geometry):
+    """Return how four times the Euler number of mask changes when sq is toggled."""
+    flipped = mask ^ (1 << sq)
+    delta = 0
+    for window, weights in geometry.quads[sq]:
+        delta += weights[flipped & window] - weights[mask & window]
+    return delta
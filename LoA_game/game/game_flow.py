@@ -10,8 +10,9 @@ from ai.all_ai import (
     MCTSConnectivity
 )
 from config.translations import get_matrix_position
-import threading
-import time
+from engine.engine_process import EngineProcess, RemoteAI
+from engine.telemetry import JsonLinesSink, Telemetry
+import uuid
 import pygame
 
 class GameFlow:
@@ -49,6 +50,16 @@ class GameFlow:
         self.ai_thinking = False
         self.ai_move = None
         self.ai_player = None
+        self.ai_future = None  # The engine process's answer to the running search
+        self.ponder_ply = None  # Ply the AI last pondered on, so it ponders once a turn
+        self.engine = None  # The engine process the AIs search in, started for the first AI player
+
+        # A record of every game and AI move, see engine/telemetry.py
+        self.telemetry = Telemetry()
+        if self.settings.telemetry_file:
+            self.telemetry.subscribe(JsonLinesSink(self.settings.telemetry_file))
+        self.game_id = None
+        self.ply = 0  # Moves played in the current game
 
     def start_game(self, white_choice, black_choice):
         """Initialize players and start the game using a dictionary mapping."""
@@ -56,20 +67,21 @@ class GameFlow:
         self.white_player = self._initialize_player(white_choice, 'W')
         self.black_player = self._initialize_player(black_choice, 'B')
         self.current_turn = 'B'
-
-        # Log game start with separator
-        with open("log.txt", "a") as logfile:
-            logfile.write("\n\n" + "=" * 80 + "\n")
-            logfile.write(f"NEW GAME STARTED\n")
-            logfile.write(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            logfile.write(f"White Player: {white_choice}\n")
-            logfile.write(f"Black Player: {black_choice}\n")
-            logfile.write("=" * 80 + "\n\n")
+        self.game_id = uuid.uuid4().hex
+        self.ply = 0
+        self.ponder_ply = None
+        self.telemetry.emit('game_start', game=self.game_id, white=white_choice, black=black_choice,
+                            rows=self.settings.rows, cols=self.settings.cols,
+                            ai_time_budget=self.settings.ai_time_budget, ai_workers=self.settings.ai_workers)
 
     def _initialize_player(self, choice, color):
         """Initialize a player based on the selected choice."""
         player_class = self.PLAYER_MAP.get(choice)
-        return player_class(self, color) if player_class else 'Human'
+        if not player_class:
+            return 'Human'
+        if self.engine is None:
+            self.engine = EngineProcess()
+        return RemoteAI(self.engine, player_class, self, color)
 
     def switch_turn(self):
         """Switch turns between players."""
@@ -83,33 +95,34 @@ class GameFlow:
         current_player = self.black_player if self.current_turn == 'B' else self.white_player
         if isinstance(current_player, BaseAI):
             self._start_ai_turn(current_player)
+        elif self.settings.ponder and self.ponder_ply != self.ply:
+            self._start_ponder()
+
+    def _start_ponder(self):
+        """Let the AI opponent search ahead while the human thinks; the AI's next search stops it."""
+        self.ponder_ply = self.ply
+        opponent = self.white_player if self.current_turn == 'B' else self.black_player
+        if isinstance(opponent, BaseAI):
+            opponent.request_ponder(self.board.board_dict)
 
     def _start_ai_turn(self, ai_player):
-        """Launch AI calculation in a separate thread"""
+        """Send the position to the engine process; update picks up the move."""
         self.ai_thinking = True
         self.ai_move = None
         self.ai_player = ai_player
-    
-        def ai_thread():
-            start = time.time()
-            self.ai_move = self.ai_player.get_move(self.board.board_dict)
-            time_taken = time.time() - start
-            
-            with open("log.txt", "a") as logfile:
-                logfile.write(f"""
-                AI Type: {type(ai_player).__name__}
-                Move: {self.ai_move}
-                Time: {time_taken:.2f}s
-                Depth: {self.ai_player.search_depth}
-                Nodes: {self.ai_player.nodes_explored}\n
-                """)
-            print(f"AI took {time_taken:.2f} seconds to make a move.")
-
-        threading.Thread(target=ai_thread, daemon=True).start()
+        self.ai_future = ai_player.request_move(self.board.board_dict)
 
     def update(self):
         """Should be called every frame from main game loop"""
-        if self.ai_thinking and self.ai_move is not None:
+        if self.ai_thinking and self.ai_future.done():
+            future, self.ai_future = self.ai_future, None
+            if future.exception() is not None:
+                self._ai_failed(future.exception())
+                return
+            self.ai_move, record = future.result()
+            # Only queued here, the file is written on the telemetry thread
+            self.telemetry.emit('move', game=self.game_id, ply=self.ply + 1, **record)
+            print(f"AI took {record['seconds']:.2f} seconds to make a move.")
             self._finish_ai_turn()
 
     def _finish_ai_turn(self):
@@ -123,37 +136,29 @@ class GameFlow:
             self.ai_move = None
             self.ai_player = None
 
+    def _ai_failed(self, error):
+        """Record the AI's failed search and end the game, starting a new engine if the old one died."""
+        self.telemetry.emit('error', game=self.game_id, ply=self.ply + 1, ai=self.ai_player.ai_class.__name__,
+                            color=self.ai_player.color, error=repr(error))
+        print(f"AI failed to make a move: {error!r}")
+        self.ai_thinking = False
+        self.ai_player = None
+        if self.engine is not None and not self.engine.process.is_alive():
+            self.engine.close()
+            self.engine = None  # The next game's AI player starts another one
+        self.reset_game()
+
     def _move_piece(self, from_pos, to_pos):
         """Move a piece on the board."""
-        row_from, col_from = from_pos
-        row_to, col_to = to_pos
-
-        # Capture opponent's piece if present
-        if (row_to, col_to) in self.board.board_dict and self.board.board_dict[(row_to, col_to)] != self.current_turn:
-            self._capture_piece(row_to, col_to)
-
-        # Update board state
-        self.board.board_dict[(row_to, col_to)] = self.board.board_dict.pop((row_from, col_from))
-
-        # Update the visual piece sprite
-        for piece in self.board.pieces:
-            if piece.rect.topleft == (col_from * self.settings.square_size, row_from * self.settings.square_size):
-                piece.rect.topleft = (col_to * self.settings.square_size, row_to * self.settings.square_size)
-                break
-        self.last_move_to =(row_to, col_to)
+        # Update board state and sprites, capturing any piece on to_pos
+        self.board.move_piece(from_pos, to_pos)
+        self.last_move_to = to_pos
+        self.ply += 1
         print(f"Moving {self.current_turn} from {from_pos} to {to_pos}")
 
         self.selected_piece = None
         self.valid_moves = []
 
-    def _capture_piece(self, row, col):
-        """Remove a captured piece from the board."""
-        del self.board.board_dict[(row, col)]
-        for piece in self.board.pieces:
-            if piece.rect.topleft == (col * self.settings.square_size, row * self.settings.square_size):
-                self.board.pieces.remove(piece)
-                break
-
     def check_for_winner(self):
         """Check if there is a winner and handle game end."""
         if self.win_checker.check_win('W'):
@@ -165,10 +170,7 @@ class GameFlow:
 
     def _handle_game_end(self, winner):
         """Display winner and return to menu."""
-        # Log the game result
-        with open("log.txt", "a") as logfile:
-            logfile.write(f"\nGAME RESULT: {winner} Player Wins!\n")
-            logfile.write("=" * 80 + "\n\n")  # Add separator after game ends
+        self.telemetry.emit('game_end', game=self.game_id, winner=winner, plies=self.ply)
         
         # Display winner message
         self._update_screen()  # Ensure board is drawn first
@@ -190,8 +192,26 @@ class GameFlow:
         pygame.time.wait(3000)  # 3 second delay
         self.reset_game()
 
+    def cancel_ai_turn(self):
+        """Stop the AI's search, if one is running, and forget its move."""
+        if self.engine is not None:
+            self.engine.cancel()
+        self.ai_thinking = False
+        self.ai_move = None
+        self.ai_player = None
+        self.ai_future = None
+
+    def close(self):
+        """Stop the AI's search and the engine process, before the program quits."""
+        self.cancel_ai_turn()
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+
     def reset_game(self):
         """Reset the game state and transition back to the main menu."""
+        # A search still running would use a core and could land its move in the next game
+        self.cancel_ai_turn()
         self.white_player = None
         self.black_player = None
         self.current_turn = 'B'
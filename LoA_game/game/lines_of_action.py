@@ -1,29 +1,30 @@
 import sys
 import pygame
 from config.settings import Settings
+from engine.game import HeadlessGame
 from game.board import Board
-from game.movement import LOAMovement
-from game.win_check import WinChecker
 from game.main_menu import MainMenu
 from game.game_flow import GameFlow
 from ai.base_ai import BaseAI
 
-class LinesOfAction:
+class LinesOfAction(HeadlessGame):
+    """The pygame client: draws the engine's game and takes the players' input."""
+
     def __init__(self):
         """Initialize the game, and create game resources."""
         pygame.init()
-        self.settings = Settings()
+        settings = Settings()
         self.clock = pygame.time.Clock()
 
         # Set up the screen
         self.screen = pygame.display.set_mode(
-            (self.settings.screen_width, self.settings.screen_height))
+            (settings.screen_width, settings.screen_height))
         pygame.display.set_caption("Lines Of Action")
 
+        # Board, movement and win checking come from the engine
+        super().__init__(settings)
+
         # Initialize game components
-        self.board = Board(self)
-        self.movement = LOAMovement(self)
-        self.win_checker = WinChecker(self)
         self.game_flow = GameFlow(self)
         self.main_menu = MainMenu(self)
 
@@ -31,6 +32,15 @@ class LinesOfAction:
         self.running = True
         self.in_menu = True
 
+        # What the window shows of the game, to redraw only what changes, see _update_screen
+        self.drawn = None
+        self.turn_font = pygame.font.SysFont(None, 36)
+        self.turn_texts = {}  # Rendered turn texts, by text
+
+    def _create_board(self):
+        """Return the drawable board."""
+        return Board(self)
+
     def run_game(self):
         """Start the main loop for the game."""
         while self.running:
@@ -42,6 +52,7 @@ class LinesOfAction:
     def _run_menu_loop(self):
         """Run the menu loop."""
         self.main_menu.run_menu()
+        self.drawn = None  # The menu drew over the window
         # After exiting menu, check if we should start the game
         if self.game_flow.game_active:
             self.in_menu = False
@@ -65,6 +76,7 @@ class LinesOfAction:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+                self.game_flow.close()
                 sys.exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if not self.in_menu and self.game_flow.game_active:
@@ -75,21 +87,66 @@ class LinesOfAction:
                         self.game_flow.select_piece(mouse_pos)
 
     def _update_screen(self):
-        """Update and redraw the game screen."""
-        if not self.in_menu:
-            self.board.draw_board(self.game_flow.last_move_to)
-            if self.game_flow.game_active:
+        """
+        Update and redraw the game screen.
+
+        Only the squares that changed since the last frame are redrawn and
+        sent to the display: moved and captured pieces, the last move's
+        shade, the valid move dots and the turn text. A frame where nothing
+        changed costs a comparison. The whole board is drawn after the menu.
+        """
+        if self.in_menu:
+            return
+        flow = self.game_flow
+        active = flow.game_active
+        text = f"{flow.current_turn} Player's Turn" if active else None
+        state = (dict(self.board.board_dict) if active else {}, flow.last_move_to,
+                 tuple(flow.valid_moves) if active else (), text)
+        if state == self.drawn:
+            return
+
+        if self.drawn is None:
+            self.board.draw_board(flow.last_move_to)
+            if active:
                 self.board.draw_pieces()
-                self.board.draw_valid_moves(self.game_flow.valid_moves)
-                self._draw_player_text(
-                    self.settings.screen_width // 2, 20, 
-                    f"{self.game_flow.current_turn} Player's Turn"
-                )
+                self.board.draw_valid_moves(flow.valid_moves)
+                self._draw_player_text(self.settings.screen_width // 2, 20, text)
             pygame.display.flip()
+            self.drawn = state
+            return
+
+        pieces, last_move_to, valid_moves, _ = state
+        old_pieces, old_last_move_to, old_valid_moves, old_text = self.drawn
+        squares = {square for square in pieces.keys() | old_pieces.keys()
+                   if pieces.get(square) != old_pieces.get(square)}
+        squares.update(square for square in (last_move_to, old_last_move_to) if square)
+        squares.update(set(valid_moves) ^ set(old_valid_moves))
+        if text != old_text and old_text:
+            squares.update(self.board.squares_under(self._player_text_rect(old_text)))
+        # The text sits on the board: when a square under it is redrawn, all
+        # of them are, and the text goes back on top of a clean background
+        under_text = self.board.squares_under(self._player_text_rect(text)) if text else set()
+        redraw_text = text != old_text or not under_text.isdisjoint(squares)
+        if text and redraw_text:
+            squares.update(under_text)
+        rects = self.board.draw_squares(squares, last_move_to, valid_moves, pieces=active)
+        if text and redraw_text:
+            self._draw_player_text(self.settings.screen_width // 2, 20, text)
+        pygame.display.update(rects)
+        self.drawn = state
+
+    def _player_text(self, text):
+        """Return the rendered turn text, rendered once."""
+        if text not in self.turn_texts:
+            self.turn_texts[text] = self.turn_font.render(text, True, (204, 85, 0))
+        return self.turn_texts[text]
+
+    def _player_text_rect(self, text):
+        """Return where the turn text is drawn."""
+        return self._player_text(text).get_rect(center=(self.settings.screen_width // 2, 20))
 
     def _draw_player_text(self, x, y, text):
         """Draw the current player's turn text."""
-        font = pygame.font.SysFont(None, 36)
-        player_text = font.render(text, True, (204, 85, 0))
+        player_text = self._player_text(text)
         text_rect = player_text.get_rect(center=(x, y))
         self.screen.blit(player_text, text_rect)
\ No newline at end of file
@@ -1,18 +1,30 @@
+from game.position import Position
+
 class LOAMovement:
+    """
+    Move generation for Lines of Action.
+
+    Every method takes the board it works on (a board dict or a Position) and
+    keeps no state of its own, so one instance can serve several searches at
+    once. Without a board argument the live game board is used.
+    """
     def __init__(self, game):
 
         self.board = game.board.board_dict
         self.settings = game.settings
 
-    def count_pieces(self, row, col, d_row, d_col):
+    def count_pieces(self, row, col, d_row, d_col, board=None):
         """Count all pieces in a row, column, or diagonal using dictionary."""
+        board = self.board if board is None else board
+        if isinstance(board, Position):
+            return board.line_count(row, col, d_row, d_col)  # Kept up to date by make_move
         count = 1
 
         # Check forward direction (d_row, d_col)
         r, c = row + d_row, col + d_col
         while 0 <= r < self.settings.rows and 0 <= c < self.settings.cols:
             try:
-                if (r, c) in self.board:
+                if (r, c) in board:
                     count += 1
             except KeyError:
                 pass
@@ -23,7 +35,7 @@ class LOAMovement:
         r, c = row - d_row, col - d_col
         while 0 <= r < self.settings.rows and 0 <= c < self.settings.cols:
             try:
-                if (r, c) in self.board:  # If there's a piece
+                if (r, c) in board:  # If there's a piece
                     count += 1
             except KeyError:
                 pass
@@ -33,24 +45,39 @@ class LOAMovement:
         return count
 
     
-    def get_valid_moves(self, row, col):
+    def get_valid_moves(self, row, col, board=None):
         """Return a list of all valid moves for a piece at (row, col)."""
+        board = self.board if board is None else board
+        if isinstance(board, Position):
+            return board.get_valid_moves(row, col)
         valid_moves = []
 
         for d_row, d_col in self.settings.directions:
-            move_distance = self.count_pieces(row, col, d_row, d_col)
+            move_distance = self.count_pieces(row, col, d_row, d_col, board)
             r, c = row + d_row * move_distance, col + d_col * move_distance
 
             # Ensure the move is within bounds
             if 0 <= r < self.settings.rows and 0 <= c < self.settings.cols:
                 # Ensure the path is clear
-                if self.is_path_clear(row, col, r, c):
+                if self.is_path_clear(row, col, r, c, board):
                     valid_moves.append((r, c))
         
         return valid_moves
+
+    def generate_moves(self, board, player):
+        """
+        Return every valid move of player on board as (from_pos, to_pos) pairs.
+
+        All of the player's pieces are handled in a single pass over the
+        position's line counts rather than one get_valid_moves call per piece.
+        """
+        if not isinstance(board, Position):
+            board = Position.from_board_dict(board, self.settings.rows, self.settings.cols)
+        return board.generate_moves(player)
     
-    def is_path_clear(self, row1, col1, row2, col2):
+    def is_path_clear(self, row1, col1, row2, col2, board=None):
         """Check if the path between (row1, col1) and (row2, col2) is clear."""
+        board = self.board if board is None else board
         d_row = (row2 - row1) // max(1, abs(row2 - row1))  # Normalize direction (-1, 0, or 1)
         d_col = (col2 - col1) // max(1, abs(col2 - col1))  # Normalize direction (-1, 0, or 1)
 
@@ -58,17 +85,17 @@ class LOAMovement:
         
         while (r, c) != (row2, col2):
             try:
-                if (r, c) in self.board:  # Obstacle in the way
-                    if self.board[(r, c)] != self.board[(row1, col1)]:  # Verifies if it's an opponent
+                if (r, c) in board:  # Obstacle in the way
+                    if board[(r, c)] != board[(row1, col1)]:  # Verifies if it's an opponent
                         return False
             except KeyError:
                 pass
             r += d_row
             c += d_col
         try:
-            if (r, c) not in self.board:
+            if (r, c) not in board:
                 return True  # Empty spot, path is clear
-            elif self.board[(r, c)] == self.board[(row1, col1)]:
+            elif board[(r, c)] == board[(row1, col1)]:
                 return False  # Piece of the same player, path blocked
             else:
                 return True  # Opponent's piece, path is valid
@@ -0,0 +1,484 @@
+import random
+from collections.abc import Mapping
+from game.connectivity import euler_delta, euler_quads, find_groups, move_piece, quad_weights, remove_piece
+
+WHITE = 'W'
+BLACK = 'B'
+
+# Xored into a position key when white is to move.
+ZOBRIST_WHITE_TO_MOVE = 0x9E3779B97F4A7C15
+
+# Same order as Settings.directions: (d_row, d_col). Directions come in
+# opposite pairs, so DIRECTIONS[i] runs along line axis i // 2.
+DIRECTIONS = (
+    (1, 0), (-1, 0),
+    (0, 1), (0, -1),
+    (1, 1), (-1, -1),
+    (1, -1), (-1, 1)
+)
+
+
+class Geometry:
+    """
+    Precomputed square and line tables for one board size.
+
+    Squares are numbered row * stride + col, where stride is one wider than
+    the board. The spare column is never occupied, so shifting a mask by one
+    square can not wrap a piece onto the next row.
+    """
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.stride = cols + 1
+
+        self.squares = [r * self.stride + c for r in range(rows) for c in range(cols)]
+        self.board_mask = 0
+        for sq in self.squares:
+            self.board_mask |= 1 << sq
+
+        # Coordinates of every square index, None for the spare column.
+        self.coords = [None] * (rows * self.stride)
+        for r in range(rows):
+            for c in range(cols):
+                self.coords[r * self.stride + c] = (r, c)
+
+        # Every column, row, diagonal and anti-diagonal gets a line id.
+        # line_ids[sq] lists the ids of the four lines through sq, in axis
+        # order, and line_masks[line_id] the squares on that line.
+        diagonals = rows + cols - 1
+        self.line_count = cols + rows + 2 * diagonals
+        self.line_masks = [0] * self.line_count
+        self.line_ids = [None] * (rows * self.stride)
+        for r in range(rows):
+            for c in range(cols):
+                ids = (
+                    c,
+                    cols + r,
+                    cols + rows + (r - c + cols - 1),
+                    cols + rows + diagonals + (r + c)
+                )
+                for line_id in ids:
+                    self.line_masks[line_id] |= 1 << (r * self.stride + c)
+                self.line_ids[r * self.stride + c] = ids
+
+        # rays[sq] holds one list per direction, indexed by move distance, of
+        # (target square, mask of the squares strictly between). A ray stops
+        # at the edge, so a distance past its end is an off-board move.
+        self.rays = [None] * (rows * self.stride)
+        for sq in self.squares:
+            r, c = self.coords[sq]
+            rays = []
+            for d_row, d_col in DIRECTIONS:
+                ray = [None]
+                between = 0
+                nr, nc = r + d_row, c + d_col
+                while 0 <= nr < rows and 0 <= nc < cols:
+                    target = nr * self.stride + nc
+                    ray.append((target, between))
+                    between |= 1 << target
+                    nr += d_row
+                    nc += d_col
+                rays.append(ray)
+            self.rays[sq] = rays
+
+        # The up to eight squares around each square.
+        self.neighbours = [0] * (rows * self.stride)
+        for sq in self.squares:
+            self.neighbours[sq] = self.dilate(1 << sq) ^ (1 << sq)
+
+        # Every 2x2 window whose top left corner is on the board or one step
+        # above or left of it, as (mask, quad_weights) pairs. quads[sq] lists
+        # the up to four windows that hold sq.
+        self.quad_windows = []
+        self.quads = [()] * (rows * self.stride)
+        for r in range(-1, rows):
+            for c in range(-1, cols):
+                window = [nr * self.stride + nc
+                          for nr, nc in ((r, c), (r, c + 1), (r + 1, c), (r + 1, c + 1))
+                          if 0 <= nr < rows and 0 <= nc < cols]
+                mask = 0
+                for sq in window:
+                    mask |= 1 << sq
+                entry = (mask, quad_weights(window))
+                self.quad_windows.append(entry)
+                for sq in window:
+                    self.quads[sq] += (entry,)
+
+        # Zobrist keys, a (white, black) pair per square. The generator is
+        # seeded with the board size so every process derives the same keys.
+        rng = random.Random(rows * 100 + cols)
+        self.zobrist = [None] * (rows * self.stride)
+        for sq in self.squares:
+            self.zobrist[sq] = (rng.getrandbits(64), rng.getrandbits(64))
+
+    def index(self, row, col):
+        """Return the square index of (row, col)."""
+        return row * self.stride + col
+
+    def dilate(self, mask):
+        """Grow a mask by one square in all eight directions."""
+        mask |= (mask << 1) | (mask >> 1)
+        mask |= (mask << self.stride) | (mask >> self.stride)
+        return mask & self.board_mask
+
+
+_GEOMETRIES = {}
+
+
+def get_geometry(rows, cols):
+    """Return the shared, read-only tables for a board size."""
+    geometry = _GEOMETRIES.get((rows, cols))
+    if geometry is None:
+        geometry = Geometry(rows, cols)
+        _GEOMETRIES[(rows, cols)] = geometry
+    return geometry
+
+
+def iter_bits(mask):
+    """Yield the square index of every set bit in mask."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Position(Mapping):
+    """
+    A compact bitboard position: one integer mask per colour plus the board size.
+
+    Reads like Board.board_dict ({(row, col): 'W' | 'B'}), so the heuristics and
+    the UI code keep working on it, while search uses the mask based methods.
+
+    line_counts holds the number of pieces on every line (see Geometry) and is
+    kept up to date by make_move, so a move distance is a single lookup.
+
+    Search plays moves in place with make_move and takes them back with
+    unmake_move; history is the undo stack of the moves made so far.
+
+    key is the Zobrist hash of the pieces and is updated the same way.
+
+    white_groups and black_groups hold each side's connected groups (see
+    game.connectivity) once they have been asked for, and make_move then
+    keeps them current, so is_connected rarely needs a flood fill.
+
+    white_euler and black_euler hold four times the Euler number of each
+    side's pieces, from the quad counts (see game.connectivity). They are
+    always kept current and let is_connected prove a side is split before
+    its groups are known.
+    """
+
+    __slots__ = ('geometry', 'rows', 'cols', 'white', 'black', 'line_counts', 'history', 'key',
+                 'white_groups', 'black_groups', 'white_euler', 'black_euler')
+
+    def __init__(self, rows, cols, white=0, black=0, line_counts=None, key=None):
+        self.geometry = get_geometry(rows, cols)
+        self.rows = rows
+        self.cols = cols
+        self.white = white
+        self.black = black
+        if line_counts is None:
+            occupied = white | black
+            line_counts = [(mask & occupied).bit_count() for mask in self.geometry.line_masks]
+        self.line_counts = line_counts
+        if key is None:
+            key = 0
+            zobrist = self.geometry.zobrist
+            for sq in iter_bits(white):
+                key ^= zobrist[sq][0]
+            for sq in iter_bits(black):
+                key ^= zobrist[sq][1]
+        self.key = key
+        self.history = []
+        self.white_groups = None  # Worked out on first use
+        self.black_groups = None
+        self.white_euler = euler_quads(white, self.geometry)
+        self.black_euler = euler_quads(black, self.geometry)
+
+    @classmethod
+    def from_board_dict(cls, board_dict, rows, cols):
+        """Build a position from a {(row, col): 'W' | 'B'} dictionary."""
+        if isinstance(board_dict, Position):
+            return board_dict.copy()
+        stride = cols + 1
+        white = black = 0
+        for (row, col), piece in board_dict.items():
+            if piece == WHITE:
+                white |= 1 << (row * stride + col)
+            else:
+                black |= 1 << (row * stride + col)
+        return cls(rows, cols, white, black)
+
+    def to_board_dict(self):
+        """Return the position as a {(row, col): 'W' | 'B'} dictionary."""
+        return dict(self.items())
+
+    def copy(self):
+        position = Position(self.rows, self.cols, self.white, self.black, self.line_counts[:], self.key)
+        position.white_groups = self.white_groups
+        position.black_groups = self.black_groups
+        return position
+
+    # ------------------------------------------------------------------
+    # Mapping interface, so a Position can stand in for board_dict
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, pos):
+        row, col = pos
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            bit = 1 << (row * self.geometry.stride + col)
+            if self.white & bit:
+                return WHITE
+            if self.black & bit:
+                return BLACK
+        raise KeyError(pos)
+
+    def __contains__(self, pos):
+        row, col = pos
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return bool((self.white | self.black) >> (row * self.geometry.stride + col) & 1)
+        return False
+
+    def __iter__(self):
+        coords = self.geometry.coords
+        for sq in iter_bits(self.white | self.black):
+            yield coords[sq]
+
+    def __len__(self):
+        return (self.white | self.black).bit_count()
+
+    def __eq__(self, other):
+        if isinstance(other, Position):
+            return (self.rows, self.cols, self.white, self.black) == (other.rows, other.cols, other.white, other.black)
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def items(self):
+        coords = self.geometry.coords
+        for sq in iter_bits(self.white):
+            yield coords[sq], WHITE
+        for sq in iter_bits(self.black):
+            yield coords[sq], BLACK
+
+    def __repr__(self):
+        return f"Position({self.rows}x{self.cols}, {self.to_board_dict()})"
+
+    # ------------------------------------------------------------------
+    # Mask helpers
+    # ------------------------------------------------------------------
+
+    def pieces(self, player):
+        """Return the mask of the given player's pieces."""
+        return self.white if player == WHITE else self.black
+
+    def count(self, player):
+        """Return how many pieces the given player has on the board."""
+        return self.pieces(player).bit_count()
+
+    def zobrist_key(self, player):
+        """Return the hash of the position with player to move."""
+        return self.key ^ ZOBRIST_WHITE_TO_MOVE if player == WHITE else self.key
+
+    def line_count(self, row, col, d_row, d_col):
+        """Return the number of pieces on the line through (row, col) along (d_row, d_col)."""
+        axis = DIRECTIONS.index((d_row, d_col)) // 2
+        return self.line_counts[self.geometry.line_ids[row * self.geometry.stride + col][axis]]
+
+    def squares(self, player):
+        """Yield the (row, col) of each piece of the given player."""
+        coords = self.geometry.coords
+        for sq in iter_bits(self.pieces(player)):
+            yield coords[sq]
+
+    # ------------------------------------------------------------------
+    # Move generation
+    # ------------------------------------------------------------------
+
+    def _targets(self, sq, own, enemy):
+        """Return the target squares of a piece on sq owned by the side with mask own."""
+        counts = self.line_counts
+        line_ids = self.geometry.line_ids[sq]
+        rays = self.geometry.rays[sq]
+        targets = []
+        for i in range(8):
+            distance = counts[line_ids[i >> 1]]
+            ray = rays[i]
+            if distance < len(ray):
+                target, between = ray[distance]
+                if not (between & enemy) and not (own >> target & 1):
+                    targets.append(target)
+        return targets
+
+    def get_valid_moves(self, row, col):
+        """Return a list of all valid moves for the piece at (row, col)."""
+        sq = row * self.geometry.stride + col
+        if self.white >> sq & 1:
+            own, enemy = self.white, self.black
+        elif self.black >> sq & 1:
+            own, enemy = self.black, self.white
+        else:
+            return []
+        coords = self.geometry.coords
+        return [coords[target] for target in self._targets(sq, own, enemy)]
+
+    def generate_moves(self, player):
+        """
+        Return every legal move of player as ((row, col), (row, col)) pairs.
+
+        The tables are looked up once and every piece is handled in the same
+        loop, which is the hot path of all the searches.
+        """
+        if player == WHITE:
+            own, enemy = self.white, self.black
+        else:
+            own, enemy = self.black, self.white
+        geometry = self.geometry
+        coords = geometry.coords
+        line_ids = geometry.line_ids
+        rays = geometry.rays
+        counts = self.line_counts
+        moves = []
+        append = moves.append
+        mask = own
+        while mask:
+            low = mask & -mask
+            mask ^= low
+            sq = low.bit_length() - 1
+            origin = coords[sq]
+            ids = line_ids[sq]
+            piece_rays = rays[sq]
+            for i in range(8):
+                distance = counts[ids[i >> 1]]
+                ray = piece_rays[i]
+                if distance < len(ray):
+                    target, between = ray[distance]
+                    if not (between & enemy) and not (own >> target & 1):
+                        append((origin, coords[target]))
+        return moves
+
+    def make_move(self, from_pos, to_pos):
+        """
+        Move the piece on from_pos to to_pos, capturing whatever stands there.
+        The move is pushed on the undo stack.
+
+        Returns the captured piece ('W' | 'B') or None.
+        """
+        geometry = self.geometry
+        from_sq = from_pos[0] * geometry.stride + from_pos[1]
+        to_sq = to_pos[0] * geometry.stride + to_pos[1]
+        from_bit = 1 << from_sq
+        to_bit = 1 << to_sq
+        white_moves = bool(self.white & from_bit)
+        if white_moves:
+            captured = BLACK if self.black & to_bit else None
+        else:
+            captured = WHITE if self.white & to_bit else None
+        self.history.append((from_sq, to_sq, self.white_groups, self.black_groups,
+                             self.white_euler, self.black_euler, captured))
+
+        counts = self.line_counts
+        for line_id in geometry.line_ids[from_sq]:
+            counts[line_id] -= 1
+        if not captured:
+            for line_id in geometry.line_ids[to_sq]:
+                counts[line_id] += 1
+
+        zobrist = geometry.zobrist
+        if white_moves:
+            if self.white_groups is not None:
+                self.white_groups = move_piece(self.white_groups, from_sq, to_sq, geometry)
+            if captured:
+                self.black_euler += euler_delta(self.black, to_sq, geometry)
+                if self.black_groups is not None:
+                    self.black_groups = remove_piece(self.black_groups, to_sq, geometry)
+            self.white_euler += (euler_delta(self.white, from_sq, geometry)
+                                 + euler_delta(self.white ^ from_bit, to_sq, geometry))
+            self.white ^= from_bit | to_bit
+            self.black &= ~to_bit
+            self.key ^= zobrist[from_sq][0] ^ zobrist[to_sq][0]
+            if captured:
+                self.key ^= zobrist[to_sq][1]
+        else:
+            if self.black_groups is not None:
+                self.black_groups = move_piece(self.black_groups, from_sq, to_sq, geometry)
+            if captured:
+                self.white_euler += euler_delta(self.white, to_sq, geometry)
+                if self.white_groups is not None:
+                    self.white_groups = remove_piece(self.white_groups, to_sq, geometry)
+            self.black_euler += (euler_delta(self.black, from_sq, geometry)
+                                 + euler_delta(self.black ^ from_bit, to_sq, geometry))
+            self.black ^= from_bit | to_bit
+            self.white &= ~to_bit
+            self.key ^= zobrist[from_sq][1] ^ zobrist[to_sq][1]
+            if captured:
+                self.key ^= zobrist[to_sq][0]
+        return captured
+
+    def unmake_move(self):
+        """
+        Take back the last move made with make_move, restoring any captured piece.
+
+        Returns the move as a (from_pos, to_pos) pair.
+        """
+        (from_sq, to_sq, self.white_groups, self.black_groups,
+         self.white_euler, self.black_euler, captured) = self.history.pop()
+        geometry = self.geometry
+        from_bit = 1 << from_sq
+        to_bit = 1 << to_sq
+        counts = self.line_counts
+        for line_id in geometry.line_ids[from_sq]:
+            counts[line_id] += 1
+        if captured is None:
+            for line_id in geometry.line_ids[to_sq]:
+                counts[line_id] -= 1
+        zobrist = geometry.zobrist
+        if self.white & to_bit:
+            self.white ^= from_bit | to_bit
+            self.key ^= zobrist[from_sq][0] ^ zobrist[to_sq][0]
+            if captured:
+                self.black |= to_bit
+                self.key ^= zobrist[to_sq][1]
+        else:
+            self.black ^= from_bit | to_bit
+            self.key ^= zobrist[from_sq][1] ^ zobrist[to_sq][1]
+            if captured:
+                self.white |= to_bit
+                self.key ^= zobrist[to_sq][0]
+        return geometry.coords[from_sq], geometry.coords[to_sq]
+
+    # ------------------------------------------------------------------
+    # Connectivity
+    # ------------------------------------------------------------------
+
+    def groups(self, player):
+        """Return the player's connected groups as a tuple of masks."""
+        if player == WHITE:
+            if self.white_groups is None:
+                self.white_groups = find_groups(self.white, self.geometry)
+            return self.white_groups
+        if self.black_groups is None:
+            self.black_groups = find_groups(self.black, self.geometry)
+        return self.black_groups
+
+    def euler_number(self, player):
+        """Return the Euler number of the player's pieces: groups minus holes."""
+        return (self.white_euler if player == WHITE else self.black_euler) // 4
+
+    def is_connected(self, player):
+        """
+        Return True when all the player's pieces form one group.
+
+        Known groups answer at once. Otherwise an Euler number above one
+        proves the pieces are split, and only when it can not are the
+        groups worked out with a flood fill.
+        """
+        if player == WHITE:
+            groups, euler = self.white_groups, self.white_euler
+        else:
+            groups, euler = self.black_groups, self.black_euler
+        if groups is None:
+            if euler > 4:
+                return False
+            groups = self.groups(player)
+        return len(groups) == 1
@@ -1,3 +1,5 @@
+from game.position import Position
+
 class WinChecker:
     def __init__(self, game):
 
@@ -13,6 +15,8 @@ class WinChecker:
         # Get all positions of the all the teams pieces
         # print("dsa")
         # print(board1)
+        if isinstance(board1, Position):
+            return board1.is_connected(piece)  # Groups are tracked by the position
         board1 = board1 or self.board # By doing this it sets the board1 to the first value it encounters
 
         positions = [pos for pos, p in board1.items() if p == piece]
@@ -1,6 +1,8 @@
-from game.lines_of_action import LinesOfAction
-
 if __name__ == '__main__':
+    # Imported here so the engine's spawned processes, which run this
+    # file first, don't load pygame
+    from game.lines_of_action import LinesOfAction
+
     # Create an instance of the game and run it.
     loa = LinesOfAction()
     loa.run_game()
\ No newline at end of file
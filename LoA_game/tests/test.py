@@ -1,5 +1,22 @@
+import json
+import sys
+import threading
+import time
 import pytest
 from game.movement import LOAMovement
+from game.position import Position
+from game.win_check import WinChecker
+from ai.transposition import SharedTranspositionTable, TranspositionTable, EXACT, LOWER_BOUND
+from ai.all_ai import NegamaxSimple, MinimaxSimple, MCTSEnhanced, Random
+from ai.move_ordering import MoveOrderer
+from ai.worker_pool import shutdown_pool
+from engine import EngineSettings, HeadlessGame, initial_board
+from engine.book import OpeningBook, build_book, open_book, write_book
+from ai.proof_number import ProofNumberSearch, WIN, LOSS, UNKNOWN
+from engine.tablebase import Tablebase, build_tablebase, write_tablebase
+from engine.benchmark import PERFT, SIZES, benchmark_positions, compare, perft, perft_reference
+from engine.telemetry import JsonLinesSink, Telemetry, move_record
+from engine.engine_process import EngineProcess, RemoteAI
 
 class MockSettings:
     def __init__(self, rows, cols):
@@ -11,6 +28,18 @@ class MockSettings:
             (1, 1), (-1, -1), # Diagonal (Bottom-right, Top-left)
             (1, -1), (-1, 1)  # Diagonal (Bottom-left, Top-right)
         ]
+        self.tt_size_mb = 1
+        self.ai_time_budget = None
+        self.ai_hard_limit = None
+        self.ai_max_depth = 8
+        self.mcts_iterations = 200
+        self.mcts_playout_depth = 6
+        self.mcts_max_nodes = None
+        self.ai_workers = 1
+        self.solver_max_pieces = 10
+        self.solver_nodes = 0  # Off, so the search tests test search
+        self.solver_second_level = 0
+        self.solver_table_mb = 1
 
 class MockBoard:
     def __init__(self, board_dict):
@@ -62,5 +91,731 @@ class TestLOAMovement:
         # Piece surrounded by others
         assert set(sample.get_valid_moves(0, 3)) == {(1, 2)}
 
+    def test_moves_on_other_board(self, custom_board):
+        sample = custom_board
+        other = {(4, 3): 'B', (4, 5): 'W', (0, 0): 'W'}
+        # The live board is left alone, the given board is read instead
+        assert set(sample.get_valid_moves(4, 3, other)) == {(4, 1), (4, 5), (3, 3), (5, 3), (3, 2), (5, 4), (3, 4), (5, 2)}
+        position = Position.from_board_dict(sample.board, 8, 8)
+        for board in (sample.board, position):
+            expected = {(pos, move) for pos, piece in sample.board.items() if piece == 'W'
+                        for move in sample.get_valid_moves(pos[0], pos[1], board)}
+            assert set(sample.generate_moves(board, 'W')) == expected
+
+class TestPosition:
+    @pytest.fixture
+    def board_dict(self):
+        return {
+            (0, 2): 'W', (0, 3): 'B', (0, 4): 'W', (0, 5): 'W',
+            (1, 3): 'W',
+            (2, 0): 'W', (2, 5): 'W', (2, 7): 'W',
+            (3, 1): 'W', (3, 6): 'W',
+            (4, 0): 'W', (4, 3): 'B', (4, 7): 'W',
+            (5, 2): 'W', (5, 4): 'W',
+            (6, 3): 'W', (6, 5): 'W',
+            (7, 2): 'W', (7, 7): 'B',
+        }
+
+    def test_board_dict_round_trip(self, board_dict):
+        position = Position.from_board_dict(board_dict, 8, 8)
+        assert position.to_board_dict() == board_dict
+        assert position == board_dict
+        assert position[(4, 3)] == 'B' and (4, 4) not in position
+
+    def test_valid_moves_match_movement(self, board_dict):
+        position = Position.from_board_dict(board_dict, 8, 8)
+        movement = LOAMovement(MockGame(board_dict, 8, 8))
+        for row, col in board_dict:
+            assert set(position.get_valid_moves(row, col)) == set(movement.get_valid_moves(row, col))
+
+    def test_make_move_captures(self, board_dict):
+        position = Position.from_board_dict(board_dict, 8, 8)
+        assert position.make_move((7, 7), (4, 7)) == 'W'
+        assert position[(4, 7)] == 'B' and (7, 7) not in position
+        assert position.count('W') == 15
+
+    def test_line_counts_follow_moves(self, board_dict):
+        position = Position.from_board_dict(board_dict, 8, 8)
+        position.make_move((4, 3), (4, 0))  # Capture along row 4
+        position.make_move((0, 3), (1, 2))
+        fresh = Position.from_board_dict(position.to_board_dict(), 8, 8)
+        assert position.line_counts == fresh.line_counts
+        assert position.line_count(4, 0, 0, 1) == 2
+        assert LOAMovement(MockGame(position, 8, 8)).count_pieces(4, 0, 0, 1) == 2
+
+    def test_unmake_move_restores_position(self, board_dict):
+        position = Position.from_board_dict(board_dict, 8, 8)
+        line_counts = position.line_counts[:]
+        position.make_move((7, 7), (4, 7))  # Capture
+        position.make_move((2, 7), (3, 7))
+        assert position.unmake_move() == ((2, 7), (3, 7))
+        assert position.unmake_move() == ((7, 7), (4, 7))
+        assert position == board_dict
+        assert position.line_counts == line_counts and position.history == []
+
+    def test_zobrist_key_is_incremental(self, board_dict):
+        position = Position.from_board_dict(board_dict, 8, 8)
+        key = position.key
+        position.make_move((7, 7), (4, 7))  # Capture
+        assert position.key == Position.from_board_dict(position.to_board_dict(), 8, 8).key
+        position.unmake_move()
+        assert position.key == key
+        assert position.zobrist_key('W') != position.zobrist_key('B')
+
+    def test_connectivity_matches_win_checker(self):
+        board_dict = {(0, 0): 'W', (1, 1): 'W', (2, 1): 'W', (5, 5): 'B', (4, 4): 'B', (0, 5): 'B'}
+        position = Position.from_board_dict(board_dict, 6, 6)
+        checker = WinChecker(MockGame(board_dict, 6, 6))
+        for piece in ('W', 'B'):
+            assert position.is_connected(piece) == checker.check_win(piece, dict(board_dict))
+        assert checker.check_win('W', position) is True
+        assert checker.check_win('B', position) is False
+
+class TestConnectivityTracking:
+    def test_groups_follow_moves_and_undo(self):
+        board_dict = {(0, 0): 'W', (1, 1): 'W', (2, 2): 'W', (2, 4): 'W', (4, 4): 'B', (3, 3): 'B', (0, 5): 'B'}
+        position = Position.from_board_dict(board_dict, 6, 6)
+        assert len(position.groups('W')) == 2 and len(position.groups('B')) == 2
+        position.make_move((2, 4), (2, 3))  # Joins the other white group
+        assert position.is_connected('W')
+        position.make_move((3, 3), (0, 3))  # Leaves (4, 4) and lands alone
+        assert len(position.groups('B')) == 3
+        position.make_move((1, 1), (1, 3))  # Cuts the white chain in two
+        fresh = Position.from_board_dict(position.to_board_dict(), 6, 6)
+        assert sorted(position.groups('W')) == sorted(fresh.groups('W'))
+        assert not position.is_connected('W')
+        for _ in range(3):
+            position.unmake_move()
+        assert len(position.groups('W')) == 2 and position == board_dict
+
+    def test_capture_updates_opponent_groups(self):
+        board_dict = {(0, 0): 'W', (0, 1): 'W', (0, 2): 'W', (3, 1): 'B', (5, 5): 'B'}
+        position = Position.from_board_dict(board_dict, 6, 6)
+        assert position.is_connected('W') and not position.is_connected('B')
+        position.make_move((3, 1), (0, 1))  # Capture splits the white row
+        assert len(position.groups('W')) == 2
+        assert not position.is_connected('B')
+
+    def test_euler_number(self):
+        ring = {(1, 1): 'W', (1, 2): 'W', (1, 3): 'W', (2, 1): 'W', (2, 3): 'W', (3, 1): 'W', (3, 2): 'W', (3, 3): 'W'}
+        apart = {(0, 0): 'B', (0, 5): 'B', (5, 5): 'B'}
+        position = Position.from_board_dict({**ring, **apart}, 6, 6)
+        assert position.euler_number('W') == 0  # One group with one hole
+        assert position.euler_number('B') == 3
+        position.make_move((0, 0), (1, 0))  # Black steps next to the white ring
+        position.make_move((1, 2), (5, 2))  # White opens its hole and splits off a piece
+        fresh = Position.from_board_dict(position.to_board_dict(), 6, 6)
+        assert position.white_euler == fresh.white_euler and position.black_euler == fresh.black_euler
+        assert position.euler_number('W') == 2
+        position.unmake_move()
+        position.unmake_move()
+        assert position.euler_number('W') == 0 and position.euler_number('B') == 3
+
+    def test_euler_prefilter_skips_flood(self):
+        position = Position.from_board_dict({(0, 0): 'W', (4, 4): 'W', (2, 2): 'B'}, 6, 6)
+        assert not position.is_connected('W')
+        assert position.white_groups is None  # Settled by the Euler number alone
+        assert position.is_connected('B')
+
+class TestTranspositionTable:
+    def test_store_and_probe(self):
+        table = TranspositionTable(1)
+        table.store(12345, 3, EXACT, 1.5, ((0, 1), (2, 1)))
+        assert table.probe(12345)[1:5] == (3, EXACT, 1.5, ((0, 1), (2, 1)))
+        assert table.probe(12345 + table.size) is None  # Same slot, other position
+
+    def test_replacement_prefers_depth_within_a_search(self):
+        table = TranspositionTable(1)
+        other = 7 + table.size
+        table.store(7, 4, EXACT, 1.0, None)
+        table.store(other, 2, LOWER_BOUND, 2.0, None)
+        assert table.probe(7) is not None and table.probe(other) is None
+        table.new_search()
+        table.store(other, 2, LOWER_BOUND, 2.0, None)  # Older entries give way
+        assert table.probe(other) is not None
+
+class TestSharedTranspositionTable:
+    @pytest.fixture
+    def table(self):
+        table = SharedTranspositionTable(1)
+        yield table
+        table.close()
+
+    def test_attached_view_shares_entries(self, table):
+        view = SharedTranspositionTable.attach(table.name)
+        try:
+            table.store(12345, 3, LOWER_BOUND, 42.5, ((1, 2), (3, 4)))
+            assert view.probe(12345) == (12345, 3, LOWER_BOUND, 42.5, ((1, 2), (3, 4)), 0)
+            view.store(67890, 2, EXACT, -7, None)
+            assert table.probe(67890)[1:5] == (2, EXACT, -7, None)
+            assert view.size == table.size
+        finally:
+            view.close()
+
+    def test_torn_record_is_a_miss(self, table):
+        table.store(12345, 3, EXACT, 1.0, None)
+        offset = table.HEADER.size + (12345 & table.mask) * table.ENTRY_BYTES
+        table.memory.buf[offset + 9] ^= 0xFF  # Half written by another process
+        assert table.probe(12345) is None
+
+    def test_replacement_and_generation(self, table):
+        other = 12345 + table.size  # Same slot
+        table.store(12345, 5, EXACT, 1.0, None)
+        table.store(other, 2, EXACT, 2.0, None)
+        assert table.probe(other) is None
+        table.new_search()
+        view = SharedTranspositionTable.attach(table.name)
+        view.new_search()  # Workers only pick up the generation
+        assert view.generation == table.generation == 1
+        view.store(other, 2, EXACT, 2.0, None)
+        assert table.probe(other)[5] == 1
+        view.close()
+
+class TestMoveOrderer:
+    def test_order_hash_killer_history_capture(self):
+        board = {(0, 1): 'B', (2, 3): 'W', (5, 5): 'B'}
+        orderer = MoveOrderer()
+        hash_move, killer, good, capture, quiet = (
+            ((0, 1), (0, 3)), ((0, 1), (2, 1)), ((5, 5), (3, 5)), ((0, 1), (2, 3)), ((5, 5), (5, 3)))
+        orderer.record_cutoff(killer, 1, 2)
+        orderer.history[good] = 50
+        moves = [quiet, capture, good, killer, hash_move]
+        assert orderer.order(moves, board, 1, hash_move) == [hash_move, killer, good, capture, quiet]
+        # Killers belong to their ply, history is shared by all plies
+        assert orderer.order(moves, board, 0)[:2] == [good, killer]
+
+    def test_history_persists_and_ages(self):
+        orderer = MoveOrderer()
+        orderer.record_cutoff(((0, 1), (2, 1)), 3, 4)
+        orderer.new_search()
+        assert orderer.killers == []
+        assert orderer.history[((0, 1), (2, 1))] == 8
+
+class TestIterativeDeepening:
+    @pytest.fixture
+    def game(self):
+        board_dict = {}
+        for row in range(1, 5):
+            board_dict[(row, 0)] = board_dict[(row, 5)] = 'W'
+        for col in range(1, 5):
+            board_dict[(0, col)] = board_dict[(5, col)] = 'B'
+        game = MockGame(board_dict, 6, 6)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        return game
+
+    @pytest.mark.parametrize("ai_class", [NegamaxSimple, MinimaxSimple])
+    def test_returns_legal_move_within_budget(self, game, ai_class):
+        game.settings.ai_time_budget = 0.3
+        ai = ai_class(game, 'B')
+        move = ai.get_move(game.board.board_dict)
+        legal = game.movement.generate_moves(game.board.board_dict, 'B')
+        assert move in legal
+        assert ai.completed_depth >= 1
+
+    @pytest.mark.parametrize("ai_class", [NegamaxSimple, MinimaxSimple])
+    def test_root_split_matches_serial(self, game, ai_class):
+        serial = ai_class(game, 'B')
+        serial.get_move(game.board.board_dict)
+        game.settings.ai_workers = 2
+        parallel = ai_class(game, 'B')
+        try:
+            move = parallel.get_move(game.board.board_dict)
+        finally:
+            shutdown_pool()
+        assert parallel.root_score == serial.root_score
+        assert move in game.movement.generate_moves(game.board.board_dict, 'B')
+        assert len(parallel.worker_nodes) == 2 and sum(parallel.worker_nodes) == parallel.nodes_explored
+
+    def test_fixed_depth_without_budget(self, game):
+        ai = NegamaxSimple(game, 'B')
+        assert ai.get_move(game.board.board_dict) is not None
+        assert ai.completed_depth == ai.search_depth
+
+    @pytest.mark.parametrize("ai_class", [NegamaxSimple, MinimaxSimple])
+    def test_ponder(self, game, ai_class):
+        ai = ai_class(game, 'B')
+        position = Position.from_board_dict(game.board.board_dict, 6, 6)
+        position.make_move(*ai.get_move(game.board.board_dict))
+        reply = ai.ponder(position.to_board_dict())
+        assert reply in position.generate_moves('W') and ai.ponder_finished
+        pondered = ai.ponder_move
+        position.make_move(*reply)
+        assert ai.get_move(position.to_board_dict()) == pondered
+        assert ai.move_source == 'ponder' and ai.nodes_explored == 0
+
+        # A different reply is searched as usual
+        position.unmake_move()
+        ai.ponder(position.to_board_dict())
+        position.make_move(*next(move for move in position.generate_moves('W') if move != reply))
+        assert ai.get_move(position.to_board_dict()) is not None
+        assert ai.move_source == 'search'
+
+    @pytest.mark.parametrize("ai_class", [NegamaxSimple, MinimaxSimple])
+    def test_hard_limit_and_cancel(self, game, ai_class):
+        game.settings.ai_time_budget = 30
+        game.settings.ai_hard_limit = 0.3
+        ai = ai_class(game, 'B')
+        start = time.perf_counter()
+        move = ai.get_move(game.board.board_dict)
+        assert time.perf_counter() - start < 2
+        assert move in game.movement.generate_moves(game.board.board_dict, 'B')
+
+        game.settings.ai_hard_limit = None
+        ai.search_depth = 8
+        ai.time_budget = None
+        ai.cancel_token = threading.Event()
+        ai.cancel_token.set()
+        start = time.perf_counter()
+        ai.get_move(game.board.board_dict)
+        assert time.perf_counter() - start < 2
+        assert ai.completed_depth is None
+
+class TestMCTS:
+    @pytest.fixture
+    def game(self):
+        # Black connects by moving (3, 1) up to (1, 1)
+        board_dict = {(0, 0): 'B', (0, 1): 'B', (3, 1): 'B', (5, 5): 'W', (5, 3): 'W', (3, 5): 'W'}
+        game = MockGame(board_dict, 6, 6)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        return game
+
+    def test_runs_the_iteration_count(self, game):
+        ai = MCTSEnhanced(game, 'B')
+        move = ai.get_move(game.board.board_dict)
+        assert move in game.movement.generate_moves(game.board.board_dict, 'B')
+        assert ai.nodes_explored == game.settings.mcts_iterations
+
+    def test_finds_connecting_move(self, game):
+        ai = MCTSEnhanced(game, 'B')
+        assert ai.get_move(game.board.board_dict) == ((3, 1), (1, 1))
+
+    def test_node_budget(self, game):
+        game.settings.mcts_max_nodes = 40
+        ai = MCTSEnhanced(game, 'B')
+        assert ai.get_move(game.board.board_dict) == ((3, 1), (1, 1))
+        assert ai.tree_size < 40
+
+    def test_node_cap_below_fan_out(self):
+        game = MockGame(initial_board(6, 6), 6, 6)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        game.settings.mcts_max_nodes = 4
+        ai = MCTSEnhanced(game, 'B')
+        recycled = []
+        recycle = ai._recycle
+        ai._recycle = lambda root, target: (recycled.append(target), recycle(root, target))
+        assert ai.get_move(game.board.board_dict) in game.movement.generate_moves(game.board.board_dict, 'B')
+        assert ai.tree_size <= 2 * (len(ai.root.children) + 1)
+        assert len(recycled) < game.settings.mcts_iterations // 4
+
+    def test_reuses_subtree(self):
+        board_dict = {}
+        for row in range(1, 5):
+            board_dict[(row, 0)] = board_dict[(row, 5)] = 'W'
+        for col in range(1, 5):
+            board_dict[(0, col)] = board_dict[(5, col)] = 'B'
+        game = MockGame(board_dict, 6, 6)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        ai = MCTSEnhanced(game, 'B')
+        move = ai.get_move(board_dict)
+        child = next(child for child in ai.root.children if child.move == move)
+        reply = max(child.children, key=lambda grandchild: grandchild.visits)
+        position = Position.from_board_dict(board_dict, 6, 6)
+        position.make_move(*move)
+        position.make_move(*reply.move)
+        visits = reply.visits
+
+        ai.get_move(position.to_board_dict())
+        assert ai.reused_visits == visits > 0
+        assert ai.root is reply and ai.root.parent is None
+        ai.get_move(board_dict)  # Not reachable from the last root, start over
+        assert ai.reused_visits == 0
+
+    def test_root_parallel(self, game):
+        game.settings.ai_workers = 2
+        ai = MCTSEnhanced(game, 'B')
+        try:
+            assert ai.get_move(game.board.board_dict) == ((3, 1), (1, 1))
+            assert ai.nodes_explored == 2 * game.settings.mcts_iterations
+        finally:
+            shutdown_pool()
+
+    def test_time_budget(self, game):
+        game.settings.ai_time_budget = 0.2
+        game.settings.mcts_iterations = None
+        game.settings.mcts_playout_depth = None
+        ai = MCTSEnhanced(game, 'W')
+        assert ai.get_move(game.board.board_dict) is not None
+        assert ai.nodes_explored > 0
+
+    def test_ponder(self):
+        game = MockGame(initial_board(6, 6), 6, 6)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        ai = MCTSEnhanced(game, 'B')
+        position = Position.from_board_dict(game.board.board_dict, 6, 6)
+        position.make_move(*ai.get_move(game.board.board_dict))
+        reply = ai.ponder(position.to_board_dict())
+        assert ai.ponder_finished and ai.nodes_explored == game.settings.mcts_iterations
+        assert ai.reused_visits > 0  # The guess was the last tree's most visited reply
+        position.make_move(*reply)
+        assert ai.get_move(position.to_board_dict()) == ai.ponder_move
+        assert ai.move_source == 'ponder' and ai.nodes_explored == 0
+
+    def test_ponder_miss_keeps_tree(self):
+        game = MockGame(initial_board(6, 6), 6, 6)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        game.settings.mcts_iterations = 3000
+        ai = MCTSEnhanced(game, 'B')
+        position = Position.from_board_dict(game.board.board_dict, 6, 6)
+        move = ai.get_move(game.board.board_dict)
+        replies = next(child for child in ai.root.children if child.move == move).children
+        guess = max(replies, key=lambda reply: reply.visits)
+        other = max((reply for reply in replies if reply is not guess), key=lambda reply: reply.visits)
+        visits = other.visits
+        position.make_move(*move)
+        assert ai.ponder(position.to_board_dict()) == guess.move
+        position.make_move(*other.move)
+        ai.get_move(position.to_board_dict())
+        assert ai.move_source == 'search' and ai.reused_visits == visits > 0
+
+    def test_ponder_parallel(self):
+        # The workers keep their trees, so the guess comes from the heuristic:
+        # here W's one connecting move, a capture, not its first move
+        board = {(2, 2): 'W', (4, 4): 'W', (5, 1): 'W', (5, 5): 'W',
+                 (3, 4): 'B', (1, 1): 'B', (3, 3): 'B', (5, 0): 'B', (4, 0): 'B'}
+        game = MockGame(board, 6, 6)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        game.settings.ai_workers = 2
+        ai = MCTSEnhanced(game, 'B')
+        try:
+            assert game.movement.generate_moves(board, 'W')[0] != ((5, 1), (3, 3))
+            assert ai.ponder(board) == ((5, 1), (3, 3))
+            assert ai.ponder_finished
+        finally:
+            shutdown_pool()
+
+    def test_cancel(self, game):
+        game.settings.mcts_iterations = 10 ** 9
+        game.settings.ai_hard_limit = 0.2
+        ai = MCTSEnhanced(game, 'W')
+        assert ai.get_move(game.board.board_dict) is not None
+        assert 0 < ai.nodes_explored < 10 ** 9
+        ai.cancel_token = threading.Event()
+        ai.cancel_token.set()
+        # The tree of the last search is kept, its best move is the best so far
+        assert ai.get_move(game.board.board_dict) is not None
+        assert ai.nodes_explored == 0
+        fresh = MCTSEnhanced(game, 'W')
+        fresh.cancel_token = ai.cancel_token
+        assert fresh.get_move(game.board.board_dict) is None
+
+class TestProofNumberSearch:
+    @pytest.fixture
+    def position(self):
+        # Black connects by moving (3, 1) up to (1, 1)
+        board_dict = {(0, 0): 'B', (0, 1): 'B', (3, 1): 'B', (5, 5): 'W', (5, 3): 'W', (3, 5): 'W'}
+        return Position.from_board_dict(board_dict, 6, 6)
+
+    @pytest.mark.parametrize("second_level", [0, 20])
+    def test_proves_win_and_loss(self, position, second_level):
+        solver = ProofNumberSearch(5000, 1, second_level)
+        result, line = solver.solve(position, 'B')
+        assert result == WIN and line == [((3, 1), (1, 1))]
+        position.make_move(*line[0])
+        position.unmake_move()
+        # Whatever White does, Black connects next
+        result, line = solver.solve(position, 'W')
+        assert result == LOSS and len(line) == 2
+        assert not position.history
+
+    def test_budget_and_table(self, position):
+        solver = ProofNumberSearch(3, 1)
+        assert solver.solve(position, 'W') == (UNKNOWN, [])
+        solver.max_nodes = 5000
+        solver.solve(position, 'B')
+        # The solved root is in the table, so it is known before any expansion
+        solver.max_nodes = 0
+        assert solver.solve(position, 'B') == (WIN, [((3, 1), (1, 1))])
+
+    def test_ai_plays_proven_move(self, position):
+        game = MockGame(position.to_board_dict(), 6, 6)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        game.settings.solver_nodes = 5000
+        ai = MCTSEnhanced(game, 'B')
+        assert ai.get_move(game.board.board_dict) == ((3, 1), (1, 1))
+        assert ai.nodes_explored == 0 and ai.proven_line == [((3, 1), (1, 1))]
+
+class TestTablebase:
+    @pytest.fixture
+    def path(self, tmp_path):
+        path = str(tmp_path / 'tablebase_4x4.bin')
+        write_tablebase(path, 4, 4, 2, build_tablebase(4, 4, 2))
+        return path
+
+    def test_results_follow_the_moves(self, path):
+        tablebase = Tablebase(path)
+        # Black wins in three: whatever White replies, Black has a win in one
+        position = Position.from_board_dict({(0, 0): 'B', (2, 3): 'B', (0, 3): 'W', (3, 0): 'W'}, 4, 4)
+        assert tablebase.probe(position, 'B') == (WIN, 3)
+        replies = []
+        for move in position.generate_moves('B'):
+            position.make_move(*move)
+            replies.append(tablebase.probe(position, 'W'))
+            position.unmake_move()
+        assert min(distance for result, distance in replies if result == LOSS) == 2
+        other_size = Position.from_board_dict({(0, 0): 'B', (2, 3): 'B', (0, 3): 'W', (3, 0): 'W'}, 6, 6)
+        assert tablebase.probe(other_size, 'B') is None
+        tablebase.close()
+
+    def test_search_probes_tablebase(self, path):
+        board_dict = {(0, 0): 'B', (2, 3): 'B', (0, 3): 'W', (3, 0): 'W'}
+        game = MockGame(board_dict, 4, 4)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        game.settings.tablebase = path
+        ai = NegamaxSimple(game, 'B')
+        ai.search_depth = 1
+        move = ai.get_move(board_dict)
+        assert ai.root_score == 100000 - 2  # Into a loss in two for White
+        position = Position.from_board_dict(board_dict, 4, 4)
+        position.make_move(*move)
+        assert ai.tablebase.probe(position, 'W') == (LOSS, 2)
+
+    def test_broken_then_rebuilt_file(self, tmp_path):
+        path = str(tmp_path / 'tablebase_4x4.bin')
+        with open(path, 'wb') as table_file:
+            table_file.write(b'LOAT\x04\x04\x01')  # Cut short, as a half-written file would be
+        game = MockGame({(0, 0): 'B', (3, 3): 'W'}, 4, 4)
+        game.movement = LOAMovement(game)
+        game.win_checker = WinChecker(game)
+        game.settings.tablebase = path
+        ai = NegamaxSimple(game, 'B')
+        assert ai.tablebase is None
+        write_tablebase(path, 4, 4, 1, build_tablebase(4, 4, 1))
+        ai.get_move(game.board.board_dict)
+        assert ai.tablebase is not None and ai.tablebase.max_pieces == 1
+
+class TestPerft:
+    @pytest.mark.parametrize("size", SIZES)
+    def test_counts(self, size):
+        for name, (board_dict, side) in benchmark_positions(size).items():
+            position = Position.from_board_dict(board_dict, size, size)
+            assert [perft(position, side, depth) for depth in (1, 2, 3)] == PERFT[size][name][:3]
+            assert position.to_board_dict() == board_dict  # Every move taken back
+
+    @pytest.mark.parametrize("size", SIZES)
+    def test_board_dict_rules_agree(self, size):
+        game = HeadlessGame(EngineSettings(size, size))
+        for name, (board_dict, side) in benchmark_positions(size).items():
+            assert perft_reference(game, board_dict, side, 2) == PERFT[size][name][1]
+
+    def test_compare_flags_slowdowns(self):
+        baseline = {'speed': {'8': {'generate_moves': 1000.0, 'evaluate': 1000.0}}}
+        results = {'speed': {'8': {'generate_moves': 950.0, 'evaluate': 700.0, 'make_unmake': 10.0}}}
+        lines, slower = compare(results, baseline, 0.2)
+        assert slower == ['8x8 evaluate'] and len(lines) == 3
+
+class TestTelemetry:
+    def test_sink_and_callbacks(self, tmp_path):
+        path = tmp_path / 'telemetry.jsonl'
+        telemetry = Telemetry()
+        seen = []
+        telemetry.subscribe(lambda record: 1 / 0)  # A broken subscriber doesn't stop the others
+        telemetry.subscribe(seen.append)
+        sink = telemetry.subscribe(JsonLinesSink(str(path)))
+        for ply in range(3):
+            telemetry.emit('move', ply=ply, move=((0, 1), (2, 3)))
+        sink.close()
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [record['ply'] for record in records] == [0, 1, 2] == [record['ply'] for record in seen]
+        assert records[0]['event'] == 'move' and records[0]['move'] == [[0, 1], [2, 3]]
+
+    def test_move_records(self):
+        settings = EngineSettings(6, 6)
+        settings.ai_time_budget = None
+        settings.mcts_iterations = 100
+        game = HeadlessGame(settings)
+        negamax = NegamaxSimple(game, 'B')
+        first = move_record(negamax, negamax.get_move(game.board.board_dict), 0.5)
+        assert first['nodes'] > 0 and first['nps'] == first['nodes'] * 2
+        assert first['depth'] == negamax.search_depth and first['source'] == 'search'
+        assert first['cutoffs'] > 0 and 'tt_hits' in first
+        negamax.get_move(game.board.board_dict)
+        assert negamax.nodes_explored <= first['nodes']  # Counted per move
+        mcts = MCTSEnhanced(game, 'W')
+        record = move_record(mcts, mcts.get_move(game.board.board_dict), 0.1)
+        assert record['mcts_iterations'] == 100 and record['tree_size'] > 1
+        json.dumps(record)
+
+class FailingAI(NegamaxSimple):
+    """An AI whose search fails; at module level so the engine process can import it."""
+    def get_move(self, board_state):
+        raise RuntimeError("search failed")
+
+class TestEngineProcess:
+    def test_searches_in_one_process(self):
+        settings = EngineSettings(6, 6)
+        settings.ai_time_budget = None
+        game = HeadlessGame(settings)
+        engine = EngineProcess()
+        try:
+            future = engine.search(NegamaxSimple, settings, 'B', game.board.board_dict)
+            move, record = future.result(timeout=60)
+            assert move in game.movement.generate_moves(game.board.board_dict, 'B')
+            assert record['nodes'] > 0 and record['ai'] == 'NegamaxSimple'
+            game.play(*move)
+            second = RemoteAI(engine, NegamaxSimple, game, 'W').request_move(game.board.board_dict)
+            assert second.result(timeout=60)[0] in game.movement.generate_moves(game.board.board_dict, 'W')
+        finally:
+            engine.close()
+        assert not engine.process.is_alive()
+
+    def test_ponder(self):
+        settings = EngineSettings(6, 6)
+        settings.ai_time_budget = None
+        game = HeadlessGame(settings)
+        engine = EngineProcess()
+        try:
+            move, _ = engine.search(NegamaxSimple, settings, 'B', game.board.board_dict).result(timeout=60)
+            game.play(*move)
+            reply, finished = engine.ponder(NegamaxSimple, settings, 'B', game.board.board_dict).result(timeout=60)
+            assert finished
+            game.play(*reply)
+            _, record = engine.search(NegamaxSimple, settings, 'B', game.board.board_dict).result(timeout=60)
+            assert record['source'] == 'ponder'
+
+            # A search sent while the AI ponders stops the ponder
+            settings.ai_time_budget = 60
+            settings.ai_max_depth = 20
+            ponder = engine.ponder(NegamaxSimple, settings, 'W', game.board.board_dict)
+            time.sleep(0.5)
+            settings.ai_time_budget = 0.2
+            engine.search(NegamaxSimple, settings, 'W', game.board.board_dict).result(timeout=10)
+            assert ponder.result() == (ponder.result()[0], False)
+        finally:
+            engine.close()
+
+    def test_cancel(self):
+        settings = EngineSettings(6, 6)
+        settings.ai_time_budget = 60
+        settings.ai_max_depth = 20
+        game = HeadlessGame(settings)
+        engine = EngineProcess()
+        try:
+            running = engine.search(NegamaxSimple, settings, 'B', game.board.board_dict)
+            queued = engine.search(NegamaxSimple, settings, 'B', game.board.board_dict)
+            time.sleep(0.5)
+            engine.cancel()
+            assert running.cancelled() and queued.cancelled()
+            settings.ai_time_budget = 0.2
+            start = time.perf_counter()
+            move, _ = engine.search(NegamaxSimple, settings, 'B', game.board.board_dict).result(timeout=60)
+            assert time.perf_counter() - start < 10
+            assert move in game.movement.generate_moves(game.board.board_dict, 'B')
+        finally:
+            engine.close()
+
+    def test_failed_search(self):
+        settings = EngineSettings(6, 6)
+        settings.ai_time_budget = None
+        game = HeadlessGame(settings)
+        engine = EngineProcess()
+        try:
+            failed = engine.search(FailingAI, settings, 'B', game.board.board_dict)
+            error = failed.exception(timeout=60)
+            assert isinstance(error, RuntimeError) and str(error) == "search failed"
+            # The engine process outlives the failed search and serves the next one
+            assert engine.process.is_alive()
+            move, _ = engine.search(NegamaxSimple, settings, 'B', game.board.board_dict).result(timeout=60)
+            assert move in game.movement.generate_moves(game.board.board_dict, 'B')
+        finally:
+            engine.close()
+
+class TestHeadlessGame:
+    def test_no_pygame_needed(self):
+        assert 'pygame' not in sys.modules
+
+    def test_initial_board(self):
+        game = HeadlessGame(EngineSettings(6, 6))
+        assert game.board.board_dict == initial_board(6, 6)
+        assert sum(1 for piece in game.board.board_dict.values() if piece == 'W') == 8
+        assert game.board.board_dict[(0, 1)] == 'B' and (0, 0) not in game.board.board_dict
+
+    def test_play_and_winner(self):
+        game = HeadlessGame(EngineSettings(6, 6), {(0, 0): 'W', (2, 2): 'W', (4, 4): 'W', (1, 1): 'B', (5, 5): 'B'})
+        assert game.winner() is None
+        assert game.play((1, 1), (0, 0)) == 'W'  # Capture
+        game.play((5, 5), (0, 1))
+        assert game.winner() == 'B'
+        game.board.reset_board()
+        assert game.board.board_dict == initial_board(6, 6)
+
+    def test_ai_plays_on_headless_game(self):
+        settings = EngineSettings(6, 6)
+        settings.ai_time_budget = None
+        game = HeadlessGame(settings)
+        ai = NegamaxSimple(game, 'B')
+        move = ai.get_move(game.board.board_dict)
+        assert move in game.movement.generate_moves(game.board.board_dict, 'B')
+
+class TestOpeningBook:
+    @pytest.fixture
+    def book_file(self, tmp_path):
+        entries = build_book(6, games=2, plies=2, depth=1)
+        path = str(tmp_path / 'book_6x6.bin')
+        write_book(path, 6, 6, 1, entries)
+        return path, entries
+
+    def test_probe(self, book_file):
+        path, entries = book_file
+        book = OpeningBook(path)
+        start = Position.from_board_dict(initial_board(6, 6), 6, 6)
+        assert book.count == len(entries)
+        assert book.probe(start, 'B') == entries[start.zobrist_key('B')]
+        assert book.probe(start, 'W') is None
+        book.close()
+
+    def test_ai_plays_book_move(self, book_file):
+        path, entries = book_file
+        settings = EngineSettings(6, 6)
+        settings.opening_book = path
+        game = HeadlessGame(settings)
+        ai = NegamaxSimple(game, 'B')
+        start = Position.from_board_dict(game.board.board_dict, 6, 6)
+        assert ai.get_move(game.board.board_dict) == entries[start.zobrist_key('B')][0]
+        assert ai.nodes_explored == 0
+        random_ai = Random(game, 'B')
+        random_ai.get_move(game.board.board_dict)
+        assert random_ai.move_source == 'search'
+
+    def test_book_built_later(self, tmp_path):
+        settings = EngineSettings(6, 6)
+        settings.ai_time_budget = None
+        settings.opening_book = str(tmp_path / 'later_{rows}x{cols}.bin')
+        game = HeadlessGame(settings)
+        ai = NegamaxSimple(game, 'B')
+        ai.get_move(game.board.board_dict)
+        assert ai.move_source == 'search'
+        write_book(str(tmp_path / 'later_6x6.bin'), 6, 6, 1, build_book(6, games=1, plies=1, depth=1))
+        ai.get_move(game.board.board_dict)
+        assert ai.move_source == 'book'
+
+        # A rebuilt book replaces the mapped one, which keeps its old contents until it is dropped
+        book = open_book(str(tmp_path / 'later_6x6.bin'))
+        start = Position.from_board_dict(game.board.board_dict, 6, 6)
+        move = book.probe(start, 'B')[0]
+        other = next(candidate for candidate in start.generate_moves('B') if candidate != move)
+        write_book(str(tmp_path / 'later_6x6.bin'), 6, 6, 1, {start.zobrist_key('B'): (other, 0.0)})
+        assert book.probe(start, 'B')[0] == move
+        assert ai.get_move(game.board.board_dict) == other
+        assert list(tmp_path.iterdir()) == [tmp_path / 'later_6x6.bin']
+
 if __name__ == "__main__":
     pytest.main()